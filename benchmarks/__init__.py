@@ -0,0 +1,84 @@
+import asyncio
+import inspect
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from pydantic import BaseModel
+
+MIN_RUN_TIME = 0.2
+REPEAT = 5
+
+BenchmarkFunction = Callable[[], Union[Any, Awaitable[Any]]]
+BenchmarkFactory = Callable[[], Union[BenchmarkFunction, Awaitable[Optional[BenchmarkFunction]], None]]
+
+
+class BenchmarkResult(BaseModel):
+    name: str
+    number: int
+    best_ns: float
+    mean_ns: float
+
+
+class Benchmark(BaseModel):
+    name: str
+    factory: BenchmarkFactory
+
+
+benchmarks: List[Benchmark] = []
+
+
+def benchmark(name: str):
+    """Registers a factory returning the function to measure, or None to skip the benchmark."""
+
+    def wrapper(factory: BenchmarkFactory) -> BenchmarkFactory:
+        benchmarks.append(Benchmark(name=name, factory=factory))
+        return factory
+
+    return wrapper
+
+
+async def measure(function: BenchmarkFunction, number: int) -> float:
+    if inspect.iscoroutinefunction(function):
+        started_at = time.perf_counter()
+        for _ in range(number):
+            await function()
+
+        return time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    for _ in range(number):
+        function()
+
+    return time.perf_counter() - started_at
+
+
+async def run_benchmark(name: str, function: BenchmarkFunction) -> BenchmarkResult:
+    number = 1
+    while (elapsed := await measure(function, number)) < MIN_RUN_TIME:
+        number *= 10 if elapsed < MIN_RUN_TIME / 10 else 2
+
+    timings = [elapsed] + [await measure(function, number) for _ in range(REPEAT - 1)]
+    return BenchmarkResult(
+        name=name,
+        number=number,
+        best_ns=min(timings) / number * 1e9,
+        mean_ns=sum(timings) / len(timings) / number * 1e9
+    )
+
+
+async def run_benchmarks(name_filter: Optional[str] = None) -> Dict[str, BenchmarkResult]:
+    results = {}
+    for item in benchmarks:
+        if name_filter and name_filter not in item.name:
+            continue
+
+        function = item.factory()
+        if asyncio.iscoroutine(function):
+            function = await function
+
+        if function is None:
+            continue
+
+        results[item.name] = await run_benchmark(item.name, function)
+
+    return results
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from pathlib import Path
+from typing import Dict
+
+from rewire import ConfigModule, Space
+
+from benchmarks import BenchmarkResult, run_benchmarks
+
+BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Runs hot path micro-benchmarks.')
+    parser.add_argument('-k', '--filter', help='run only benchmarks whose name contains this string')
+    parser.add_argument('-o', '--output', type=Path, help='write results as JSON to this file')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help='baseline file to compare against')
+    parser.add_argument('--update-baseline', action='store_true', help='overwrite the baseline with these results')
+    parser.add_argument('--max-regression', type=float, default=0.25,
+                        help='fail if a benchmark is slower than its baseline by more than this fraction')
+    return parser.parse_args()
+
+
+def format_time(ns: float) -> str:
+    for unit, scale in (('s', 1e9), ('ms', 1e6), ('us', 1e3)):
+        if ns >= scale:
+            return f'{ns / scale:.2f} {unit}'
+
+    return f'{ns:.0f} ns'
+
+
+def dump_results(results: Dict[str, BenchmarkResult]) -> dict:
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': {name: result.model_dump(exclude={'name'}) for name, result in results.items()}
+    }
+
+
+def compare(results: Dict[str, BenchmarkResult], baseline: dict, max_regression: float) -> bool:
+    ok = True
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            print(f'{name:<40} {format_time(result.best_ns):>12}  (no baseline)')
+            continue
+
+        change = result.best_ns / previous['best_ns'] - 1
+        regressed = change > max_regression
+        ok = ok and not regressed
+
+        print(f'{name:<40} {format_time(result.best_ns):>12}  {change:+.1%}{"  REGRESSION" if regressed else ""}')
+
+    return ok
+
+
+async def main(args: argparse.Namespace) -> bool:
+    space = Space(only=[]).add(ConfigModule(config={'src': {'redis': {'url': 'redis://localhost:6379'}}}))
+    async with space.init().use():
+        import benchmarks.cases  # noqa: F401
+
+        results = await run_benchmarks(args.filter)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    ok = compare(results, baseline, args.max_regression)
+
+    if args.output:
+        args.output.write_text(json.dumps(dump_results(results), indent=2))
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(dump_results(results), indent=2) + '\n')
+
+    return ok or args.update_baseline
+
+
+if __name__ == '__main__':
+    sys.exit(0 if asyncio.run(main(parse_args())) else 1)
@@ -0,0 +1,262 @@
+import hashlib
+import hmac
+import json
+import os
+import time
+import urllib.parse
+from types import SimpleNamespace
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from benchmarks import benchmark
+from src import redis, responses
+from src.catalog import CatalogChallenge
+from src.models import (
+    Challenge, ChallengeElement, ChallengeElementResponse, ChallengeResponse, LeaderboardEntry, LeaderboardResponse,
+    PlacedElementRequest
+)
+from src.scoring import CompiledChallenge, ScoringConfig
+from src.utils import create_certificate_image, get_secret_key, parse_init_data_unsafe, validate_init_data
+
+BOT_TOKEN = 'benchmark-token'
+ELEMENTS_COUNT = 12
+SUBMISSIONS_COUNT = 100
+LEADERBOARD_SIZE = 100
+
+
+def create_init_data_string(bot_token: str = BOT_TOKEN) -> str:
+    raw_data = {
+        'auth_date': int(time.time()),
+        'query_id': 'benchmark-query',
+        'user': {
+            'id': 1,
+            'first_name': 'Иван',
+            'last_name': 'Иванов',
+            'username': 'ivan',
+            'language_code': 'ru',
+            'photo_url': 'http://example.com/avatar.jpg'
+        },
+        'chat': {
+            'id': 2,
+            'type': 'private'
+        },
+        'ip': '127.0.0.1'
+    }
+
+    data = {
+        key: json.dumps(value, separators=(',', ':'), ensure_ascii=False) if isinstance(value, dict) else str(value)
+        for key, value in raw_data.items()
+    }
+    data_check_string = '\n'.join(f'{key}={value}' for key, value in sorted(data.items()))
+    data['hash'] = hmac.new(get_secret_key(bot_token), data_check_string.encode(), hashlib.sha256).hexdigest()
+
+    return urllib.parse.urlencode(data)
+
+
+def create_challenge() -> Challenge:
+    challenge = Challenge(
+        id='benchmark',
+        name='Benchmark',
+        description='Benchmark challenge',
+        scene_width=1920,
+        scene_height=1080,
+        ordinal=1
+    )
+    challenge.elements = [
+        ChallengeElement(
+            id=f'element-{index}',
+            challenge_id=challenge.id,
+            name=f'Element {index}',
+            width=120,
+            target_x=index * 150,
+            target_y=index * 80
+        )
+        for index in range(ELEMENTS_COUNT)
+    ]
+
+    return challenge
+
+
+def create_placed_elements(offset: float = 10.0) -> list:
+    return [
+        PlacedElementRequest(id=f'element-{index}', x=index * 150 + offset, y=index * 80 - offset)
+        for index in range(ELEMENTS_COUNT)
+    ]
+
+
+@benchmark('init_data.parse')
+def bench_parse_init_data():
+    init_data_string = create_init_data_string()
+    return lambda: parse_init_data_unsafe(init_data_string)
+
+
+@benchmark('init_data.validate')
+def bench_validate_init_data():
+    init_data = parse_init_data_unsafe(create_init_data_string())
+    return lambda: validate_init_data(init_data, BOT_TOKEN)
+
+
+@benchmark('scoring.score')
+def bench_score():
+    challenge = create_challenge()
+    scorer = CompiledChallenge(challenge.elements, challenge.scene_width, challenge.scene_height, ScoringConfig())
+    placed_elements = create_placed_elements()
+    return lambda: scorer.score(placed_elements)
+
+
+@benchmark(f'scoring.score_many[{SUBMISSIONS_COUNT}]')
+def bench_score_many():
+    challenge = create_challenge()
+    scorer = CompiledChallenge(challenge.elements, challenge.scene_width, challenge.scene_height, ScoringConfig())
+    submissions = [create_placed_elements(offset) for offset in range(SUBMISSIONS_COUNT)]
+    return lambda: scorer.score_many(submissions)
+
+
+@benchmark('challenge.response_json')
+def bench_challenge_response_json():
+    challenge = create_challenge()
+
+    def build_response():
+        return ChallengeResponse(
+            **challenge.model_dump(),
+            elements=[ChallengeElementResponse(**element.model_dump()) for element in challenge.elements]
+        ).model_dump_json().encode()
+
+    return build_response
+
+
+@benchmark('challenge.catalog_entry')
+def bench_catalog_entry():
+    challenge = create_challenge()
+    return lambda: CatalogChallenge.from_model(challenge)
+
+
+def create_leaderboard() -> LeaderboardResponse:
+    entries = [
+        LeaderboardEntry(place=place, user_id=place, name=f'User {place}', score=100 - place / 10)
+        for place in range(1, LEADERBOARD_SIZE + 1)
+    ]
+    return LeaderboardResponse(total=10000, entries=entries, next_cursor=LEADERBOARD_SIZE, user_place=1, around=entries[:5])
+
+
+def create_fastapi_encoder(response_model: type):
+    # Mirrors what FastAPI does for a route declared with response_model that returns a model.
+    field = create_model_field('Response', response_model, mode='serialization')
+
+    async def encode(content):
+        return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+    return encode
+
+
+@benchmark('challenge.encode_fastapi')
+def bench_challenge_encode_fastapi():
+    challenge = create_challenge()
+    response = ChallengeResponse(
+        **challenge.model_dump(),
+        elements=[ChallengeElementResponse(**element.model_dump()) for element in challenge.elements]
+    )
+    encode = create_fastapi_encoder(ChallengeResponse)
+
+    async def encode_challenge():
+        return await encode(response)
+
+    return encode_challenge
+
+
+@benchmark('leaderboard.encode_fastapi')
+def bench_leaderboard_encode_fastapi():
+    leaderboard = create_leaderboard()
+    encode = create_fastapi_encoder(LeaderboardResponse)
+
+    async def encode_leaderboard():
+        return await encode(leaderboard)
+
+    return encode_leaderboard
+
+
+@benchmark('leaderboard.encode_json')
+def bench_leaderboard_encode_json():
+    leaderboard = create_leaderboard()
+    return lambda: responses.encode_json(leaderboard)
+
+
+@benchmark('leaderboard.encode_msgpack')
+def bench_leaderboard_encode_msgpack():
+    leaderboard = create_leaderboard()
+    return lambda: responses.encode_msgpack(leaderboard)
+
+
+@benchmark('certificate.render')
+def bench_certificate_render():
+    return lambda: create_certificate_image('Иван Иванов', 87.5)
+
+
+async def create_benchmark_redis():
+    url = os.environ.get('REDIS_URL')
+    if url:
+        from redis.asyncio import Redis
+        return Redis.from_url(url, decode_responses=True)
+
+    try:
+        from fakeredis.aioredis import FakeRedis
+    except ImportError:
+        return None
+
+    return FakeRedis(decode_responses=True)
+
+
+def use_redis(client):
+    redis.get_redis = lambda: client
+
+
+@benchmark('redis.submit_user_challenge_score')
+async def bench_submit_user_challenge_score():
+    client = await create_benchmark_redis()
+    if client is None:
+        return None
+
+    use_redis(client)
+    await client.flushdb()
+    counter = SimpleNamespace(value=0)
+
+    async def submit():
+        counter.value += 1
+        await redis.submit_user_challenge_score(counter.value % 1000, f'challenge-{counter.value % 7}', 75.0, 'Иван')
+
+    return submit
+
+
+@benchmark('redis.get_scores_leaderboard')
+async def bench_get_scores_leaderboard():
+    client = await create_benchmark_redis()
+    if client is None:
+        return None
+
+    use_redis(client)
+    await client.flushdb()
+    await client.zadd('user:ratings', {str(user_id): user_id % 100 for user_id in range(1000)})
+
+    async def get_leaderboard():
+        await redis.get_scores_leaderboard(10)
+
+    return get_leaderboard
+
+
+@benchmark('redis.get_user_names')
+async def bench_get_user_names():
+    client = await create_benchmark_redis()
+    if client is None:
+        return None
+
+    use_redis(client)
+    await client.flushdb()
+    await redis.set_user_names({user_id: f'User {user_id}' for user_id in range(1000)})
+    user_ids = list(range(10))
+
+    async def get_user_names():
+        await redis.get_user_names(user_ids)
+
+    return get_user_names
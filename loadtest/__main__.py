@@ -0,0 +1,160 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from pydantic import BaseModel
+
+from loadtest.init_data import create_init_data
+from loadtest.seed import get_user_ids, seed_users
+
+GET_CHALLENGE = 'GET /api/challenges'
+COMPLETE_CHALLENGE = 'POST /api/challenges/complete'
+
+
+class EndpointReport(BaseModel):
+    requests: int
+    errors: int
+    statuses: Dict[str, int]
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, endpoint: str, status: str, latency: float):
+        self.latencies[endpoint].append(latency)
+        self.statuses[endpoint][status] += 1
+
+    def report(self, duration: float) -> Dict[str, EndpointReport]:
+        reports = {}
+        for endpoint, latencies in self.latencies.items():
+            p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+            statuses = self.statuses[endpoint]
+            reports[endpoint] = EndpointReport(
+                requests=len(latencies),
+                errors=sum(count for status, count in statuses.items() if not status.startswith('2')),
+                statuses=dict(statuses),
+                throughput=len(latencies) / duration,
+                p50_ms=p50,
+                p95_ms=p95,
+                p99_ms=p99,
+                max_ms=max(latencies) * 1000
+            )
+
+        return reports
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m loadtest', description='Drives the mini-app API with synthetic players.')
+    parser.add_argument('--url', default='http://localhost:8080', help='base URL of the running application')
+    parser.add_argument('--bot-token', default=os.environ.get('BOT_TOKEN'), help='token used to sign init data')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'), help='database to seed users into')
+    parser.add_argument('--no-seed', action='store_true', help='use already seeded users')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--user-id-offset', type=int, default=10 ** 12, help='first synthetic user id')
+    parser.add_argument('--concurrency', type=int, default=100, help='number of concurrently playing users')
+    parser.add_argument('--duration', type=float, default=30.0, help='test duration in seconds')
+    parser.add_argument('--complete-ratio', type=float, default=0.2,
+                        help='share of challenge views followed by a completion')
+    parser.add_argument('-o', '--output', type=Path, help='write the report as JSON to this file')
+    return parser.parse_args()
+
+
+def create_completion(challenge: dict) -> dict:
+    return {
+        'placed_elements': [
+            {
+                'id': element['id'],
+                'x': random.uniform(0, challenge['scene_width']),
+                'y': random.uniform(0, challenge['scene_height'])
+            }
+            for element in challenge['elements']
+        ]
+    }
+
+
+async def request(session: ClientSession, recorder: Recorder, endpoint: str, method: str, path: str, **kwargs):
+    started_at = time.perf_counter()
+    try:
+        async with session.request(method, path, **kwargs) as response:
+            body = await response.read()
+            status = str(response.status)
+    except Exception as e:
+        body, status = None, type(e).__name__
+
+    recorder.record(endpoint, status, time.perf_counter() - started_at)
+    return json.loads(body) if body and status == '200' else None
+
+
+async def play(session: ClientSession, recorder: Recorder, init_data: Dict[int, str], deadline: float, complete_ratio: float):
+    user_ids = list(init_data)
+    while time.monotonic() < deadline:
+        headers = {'X-Init-Data': init_data[random.choice(user_ids)]}
+
+        challenge = await request(session, recorder, GET_CHALLENGE, 'GET', '/api/challenges', headers=headers)
+        if challenge and random.random() < complete_ratio:
+            await request(
+                session, recorder, COMPLETE_CHALLENGE, 'POST', '/api/challenges/complete',
+                headers=headers, json=create_completion(challenge)
+            )
+
+
+async def main(args: argparse.Namespace):
+    if not args.bot_token:
+        sys.exit('The bot token is required to sign init data (--bot-token or BOT_TOKEN)')
+
+    user_ids = get_user_ids(args.users, args.user_id_offset)
+    if not args.no_seed:
+        if not args.database_url:
+            sys.exit('The database URL is required to seed users (--database-url or DATABASE_URL)')
+
+        challenge_id = await seed_users(args.database_url, user_ids)
+        print(f'Seeded {len(user_ids)} users with challenge {challenge_id}')
+
+    init_data = {user_id: create_init_data(user_id, args.bot_token) for user_id in user_ids}
+    recorder = Recorder()
+
+    connector = TCPConnector(limit=args.concurrency)
+    async with ClientSession(args.url, connector=connector, timeout=ClientTimeout(total=30)) as session:
+        started_at = time.monotonic()
+        deadline = started_at + args.duration
+        await asyncio.gather(*(
+            play(session, recorder, init_data, deadline, args.complete_ratio)
+            for _ in range(args.concurrency)
+        ))
+        duration = time.monotonic() - started_at
+
+    reports = recorder.report(duration)
+    print(f'{"endpoint":<32} {"requests":>9} {"errors":>7} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"max ms":>9}')
+    for endpoint, report in reports.items():
+        print(
+            f'{endpoint:<32} {report.requests:>9} {report.errors:>7} {report.throughput:>9.1f} '
+            f'{report.p50_ms:>9.1f} {report.p95_ms:>9.1f} {report.p99_ms:>9.1f} {report.max_ms:>9.1f}'
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            'users': args.users,
+            'concurrency': args.concurrency,
+            'duration': duration,
+            'endpoints': {endpoint: report.model_dump() for endpoint, report in reports.items()}
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
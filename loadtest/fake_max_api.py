@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+from aiohttp import web
+
+BOT_USER = {
+    'user_id': 1,
+    'first_name': 'Load test bot',
+    'username': 'loadtest_bot',
+    'is_bot': True,
+    'last_activity_time': 0
+}
+
+
+class FakeMaxApi:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.message_ids = itertools.count(1)
+
+    async def delay(self, name: str):
+        self.calls[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def me(self, _: web.Request) -> web.Response:
+        await self.delay('me')
+        return web.json_response(BOT_USER)
+
+    async def subscriptions(self, _: web.Request) -> web.Response:
+        await self.delay('subscriptions')
+        return web.json_response({'subscriptions': []})
+
+    async def updates(self, request: web.Request) -> web.Response:
+        self.calls['updates'] += 1
+        await asyncio.sleep(min(float(request.query.get('timeout', 30)), 30))
+        return web.json_response({'updates': [], 'marker': int(request.query.get('marker', 0) or 0)})
+
+    async def chat(self, request: web.Request) -> web.Response:
+        await self.delay('chat')
+        return web.json_response({
+            'chat_id': int(request.match_info['chat_id']),
+            'type': 'dialog',
+            'status': 'active',
+            'last_event_time': int(time.time() * 1000),
+            'participants_count': 2,
+            'is_public': False
+        })
+
+    async def send_message(self, request: web.Request) -> web.Response:
+        await self.delay('send_message')
+        body = await request.json()
+
+        return web.json_response({
+            'message': {
+                'sender': BOT_USER,
+                'recipient': {'user_id': int(request.query.get('user_id', 0)), 'chat_type': 'dialog'},
+                'timestamp': int(time.time() * 1000),
+                'body': {'mid': f'mid.{next(self.message_ids)}', 'seq': 0, 'text': body.get('text')}
+            }
+        })
+
+    async def delete_message(self, _: web.Request) -> web.Response:
+        await self.delay('delete_message')
+        return web.json_response({'success': True})
+
+    async def upload_url(self, request: web.Request) -> web.Response:
+        await self.delay('upload_url')
+        return web.json_response({'url': str(request.url.with_path('/upload').with_query(None))})
+
+    async def upload(self, request: web.Request) -> web.Response:
+        await self.delay('upload')
+        await request.read()
+        return web.json_response({'photos': {'photo': {'token': f'token.{next(self.message_ids)}'}}})
+
+    async def stats(self, _: web.Request) -> web.Response:
+        return web.json_response(dict(self.calls))
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=32 * 1024 * 1024)
+        app.add_routes([
+            web.get('/me', self.me),
+            web.get('/subscriptions', self.subscriptions),
+            web.get('/updates', self.updates),
+            web.get('/chats/{chat_id}', self.chat),
+            web.post('/messages', self.send_message),
+            web.delete('/messages', self.delete_message),
+            web.post('/uploads', self.upload_url),
+            web.post('/upload', self.upload),
+            web.get('/stats', self.stats)
+        ])
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m loadtest.fake_max_api', description='Local stand-in for the MAX Bot API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.05, help='artificial delay of every API call in seconds')
+    args = parser.parse_args()
+
+    fake_api = FakeMaxApi(args.latency)
+    web.run_app(fake_api.create_app(), host=args.host, port=args.port)
+    print(f'Calls: {dict(fake_api.calls)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import hashlib
+import hmac
+import json
+import time
+import urllib.parse
+from typing import Optional
+
+from src.utils import get_secret_key
+
+
+def create_init_data(user_id: int, bot_token: str, auth_date: Optional[int] = None) -> str:
+    raw_data = {
+        'auth_date': auth_date or int(time.time()),
+        'query_id': f'loadtest-{user_id}',
+        'user': {
+            'id': user_id,
+            'first_name': f'User {user_id}',
+            'last_name': None,
+            'username': f'loadtest_{user_id}',
+            'language_code': 'ru',
+            'photo_url': None
+        },
+        'chat': {
+            'id': user_id,
+            'type': 'dialog'
+        },
+        'ip': '127.0.0.1'
+    }
+
+    data = {
+        key: json.dumps(value, separators=(',', ':'), ensure_ascii=False) if isinstance(value, dict) else str(value)
+        for key, value in raw_data.items()
+    }
+    data_check_string = '\n'.join(f'{key}={value}' for key, value in sorted(data.items()))
+    data['hash'] = hmac.new(get_secret_key(bot_token), data_check_string.encode(), hashlib.sha256).hexdigest()
+
+    return urllib.parse.urlencode(data)
@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.models import User, Challenge
+
+CHUNK_SIZE = 1000
+
+
+def get_user_ids(users: int, offset: int) -> List[int]:
+    return list(range(offset, offset + users))
+
+
+async def seed_users(database_url: str, user_ids: List[int]) -> str:
+    engine = create_async_engine(database_url.replace('postgresql://', 'postgresql+asyncpg://'))
+    try:
+        async with engine.begin() as connection:
+            challenge_id = (await connection.execute(select(Challenge.id).order_by(Challenge.ordinal, Challenge.id).limit(1))).scalar()
+            if challenge_id is None:
+                raise RuntimeError('There are no challenges in the database to assign to load test users!')
+
+            for start in range(0, len(user_ids), CHUNK_SIZE):
+                statement = insert(User).values([
+                    {
+                        'id': user_id,
+                        'created_at': datetime.now(),
+                        'name': f'User {user_id}',
+                        'username': f'loadtest_{user_id}',
+                        'current_challenge_id': challenge_id,
+                        'last_challenge_message_id': f'mid.loadtest.{user_id}',
+                        'received_certificate': False
+                    }
+                    for user_id in user_ids[start:start + CHUNK_SIZE]
+                ])
+                await connection.execute(statement.on_conflict_do_update(
+                    index_elements=[User.id],
+                    set_={
+                        'current_challenge_id': statement.excluded.current_challenge_id,
+                        'last_challenge_message_id': statement.excluded.last_challenge_message_id,
+                        'received_certificate': statement.excluded.received_certificate
+                    }
+                ))
+    finally:
+        await engine.dispose()
+
+    return challenge_id
@@ -1,23 +1,48 @@
-import json
+from typing import List, Literal, Optional
 
 from maxapi import Bot, Dispatcher
 from maxapi.enums.parse_mode import ParseMode
-from maxapi.enums.upload_type import UploadType
-from maxapi.types import Attachment, OtherAttachmentPayload
-from pydantic import BaseModel
+from maxapi.types import Attachment
+from maxapi.types.errors import Error
+from pydantic import BaseModel, model_validator
 from rewire import config, simple_plugin, DependenciesModule, logger
 
+from src import metrics
+
 plugin = simple_plugin()
 
 
 @config
 class Config(BaseModel):
     token: str
+    previous_tokens: List[str] = []
+    api_url: Optional[str] = None
+
+    mode: Literal['polling', 'webhook'] = 'polling'
+    webhook_url: Optional[str] = None
+    webhook_secret: Optional[str] = None
+    webhook_concurrency: int = 100
+    webhook_max_pending: int = 10000
+
+    @model_validator(mode='after')
+    def check_webhook_secret(self) -> 'Config':
+        if self.mode == 'webhook' and not self.webhook_secret:
+            raise ValueError('webhook_secret is required in the webhook mode')
+
+        return self
+
+    @property
+    def init_data_tokens(self) -> List[str]:
+        return [self.token, *self.previous_tokens]
 
 
 @plugin.setup()
 async def create_bot() -> Bot:
-    return Bot(Config.token, parse_mode=ParseMode.HTML)
+    bot = Bot(Config.token, parse_mode=ParseMode.HTML)
+    if Config.api_url:
+        bot.set_api_url(Config.api_url)
+
+    return bot
 
 
 @plugin.setup()
@@ -27,31 +52,24 @@ async def create_dispatcher() -> Dispatcher:
 
 @plugin.run()
 async def start_bot(bot: Bot, dispatcher: Dispatcher):
-    await dispatcher.start_polling(bot)
+    if Config.mode == 'polling':
+        await dispatcher.start_polling(bot)
 
 
 async def send_user_message(user_id: int, text: str, *attachments: Attachment):
     try:
-        await get_bot().send_message(user_id=user_id, text=text, attachments=[*attachments])
+        with metrics.bot_call('send_message'):
+            result = await get_bot().send_message(user_id=user_id, text=text, attachments=[*attachments])
+
+        if isinstance(result, Error):
+            metrics.BOT_CALL_ERRORS.labels('send_message').inc()
     except Exception as e:
         logger.error(f'Failed to send message (user_id={user_id}): {e}')
 
 
 async def delete_user_message(message_id: str):
-    await get_bot().delete_message(message_id)
-
-
-async def upload_image(file_path: str) -> OtherAttachmentPayload:
-    upload_url = await get_bot().get_upload_url(UploadType.IMAGE)
-    upload_result = await get_bot().upload_file(upload_url.url, file_path, UploadType.IMAGE)
-
-    photos_data = json.loads(upload_result)['photos']
-    photo_data = next(iter(photos_data.values()))
-
-    return OtherAttachmentPayload(
-        token=photo_data['token'],
-        url=upload_url.url
-    )
+    with metrics.bot_call('delete_message'):
+        await get_bot().delete_message(message_id)
 
 
 def get_bot() -> Bot:
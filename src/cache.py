@@ -0,0 +1,56 @@
+import time
+from collections import OrderedDict
+from typing import Generic, Optional, Tuple, TypeVar, TYPE_CHECKING
+
+from pydantic import BaseModel
+from rewire import config
+
+if TYPE_CHECKING:
+    from src.models import User
+
+
+@config(fallback={})
+class Config(BaseModel):
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 30.0
+    user_write_window: float = 10.0
+
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+
+class TTLCache(Generic[K, V]):
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict[K, Tuple[V, float]] = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, expires_at: float):
+        if expires_at <= time.time():
+            return
+
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key: K):
+        self.entries.pop(key, None)
+
+
+# Users are cached together with the Redis version they were loaded at.
+user_cache: TTLCache[int, Tuple['User', int]] = TTLCache(Config.user_cache_size)
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict
+from rewire import simple_plugin, DependenciesModule, config, logger
+from rewire_sqlmodel import transaction
+
+from src import redis, responses
+from src.models import Challenge, ChallengeResponse, ChallengeElementResponse
+from src.scoring import CompiledChallenge
+
+plugin = simple_plugin()
+
+
+@config(fallback={})
+class Config(BaseModel):
+    version_check_interval: float = 10.0
+
+
+class CatalogElement(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    id: str
+    name: str
+    width: float
+    target_x: float
+    target_y: float
+
+
+class CatalogChallenge(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    id: str
+    name: str
+    description: str
+    ordinal: int
+    scene_width: float
+    scene_height: float
+    elements: Tuple[CatalogElement, ...]
+    response_json: bytes
+    response_msgpack: bytes
+
+    @classmethod
+    def from_model(cls, challenge: Challenge) -> 'CatalogChallenge':
+        response = ChallengeResponse(
+            **challenge.model_dump(),
+            elements=[
+                ChallengeElementResponse(**element.model_dump())
+                for element in challenge.elements
+            ]
+        )
+
+        return cls(
+            **challenge.model_dump(),
+            elements=tuple(CatalogElement(**element.model_dump()) for element in challenge.elements),
+            response_json=responses.encode_json(response),
+            response_msgpack=responses.encode_msgpack(response)
+        )
+
+
+class ChallengeCatalog:
+    def __init__(self, version_check_interval: float):
+        self.version_check_interval = version_check_interval
+        self.challenges: Dict[str, CatalogChallenge] = {}
+        self.scorers: Dict[str, CompiledChallenge] = {}
+        self.order: List[CatalogChallenge] = []
+        self.positions: Dict[str, int] = {}
+        self.version: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+
+    @transaction(0)
+    async def reload(self):
+        version = await redis.get_challenges_version()
+        challenges = (await Challenge.select().order_by(Challenge.ordinal, Challenge.id).unique()).all()
+
+        self.order = [CatalogChallenge.from_model(challenge) for challenge in challenges]
+        self.positions = {challenge.id: position for position, challenge in enumerate(self.order)}
+        self.challenges = {challenge.id: challenge for challenge in self.order}
+        self.scorers = {
+            challenge.id: CompiledChallenge(challenge.elements, challenge.scene_width, challenge.scene_height)
+            for challenge in self.order
+        }
+        self.version = version
+        self.checked_at = time.monotonic()
+
+        logger.info(f'Loaded {len(self.order)} challenges into the catalog (version={version})')
+
+    async def refresh(self):
+        if self.checked_at is not None and time.monotonic() - self.checked_at < self.version_check_interval:
+            return
+
+        async with self.lock:
+            if self.checked_at is not None and time.monotonic() - self.checked_at < self.version_check_interval:
+                return
+
+            if self.checked_at is None or await redis.get_challenges_version() != self.version:
+                await self.reload()
+            else:
+                self.checked_at = time.monotonic()
+
+    async def get(self, challenge_id: str) -> Optional[CatalogChallenge]:
+        await self.refresh()
+        return self.challenges.get(challenge_id)
+
+    async def get_scorer(self, challenge_id: str) -> Optional[CompiledChallenge]:
+        await self.refresh()
+        return self.scorers.get(challenge_id)
+
+    async def get_next(self, completed_ids: Optional[List[str]] = None) -> Optional[CatalogChallenge]:
+        await self.refresh()
+
+        position = get_first_missing_position(self.get_progress(completed_ids or ()))
+        return self.order[position] if position < len(self.order) else None
+
+    def get_progress(self, completed_ids: Iterable[str]) -> int:
+        progress = 0
+        for challenge_id in completed_ids:
+            position = self.positions.get(challenge_id)
+            if position is not None:
+                progress |= 1 << position
+
+        return progress
+
+
+def get_first_missing_position(progress: int) -> int:
+    return (~progress & (progress + 1)).bit_length() - 1
+
+
+@plugin.setup()
+async def create_catalog() -> ChallengeCatalog:
+    return ChallengeCatalog(Config.version_check_interval)
+
+
+def get_catalog() -> ChallengeCatalog:
+    return DependenciesModule.get().resolve(ChallengeCatalog)
+
+
+async def get_challenge(challenge_id: str) -> Optional[CatalogChallenge]:
+    return await get_catalog().get(challenge_id)
+
+
+async def get_challenge_scorer(challenge_id: str) -> Optional[CompiledChallenge]:
+    return await get_catalog().get_scorer(challenge_id)
+
+
+async def get_next_challenge(completed_ids: Optional[List[str]] = None) -> Optional[CatalogChallenge]:
+    return await get_catalog().get_next(completed_ids)
@@ -0,0 +1,73 @@
+from contextlib import asynccontextmanager
+from functools import wraps
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from pydantic import BaseModel
+from rewire import config, simple_plugin, DependenciesModule, LifecycleModule
+from rewire_sqlmodel import ConnectionConfig, session_context, setup_engine, transaction
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+plugin = simple_plugin()
+
+T = TypeVar('T')
+
+
+@config(fallback={})
+class Config(BaseModel):
+    replica_url: Optional[str] = None
+
+
+class ReplicaSessionmaker(async_sessionmaker[AsyncSession]):
+    pass
+
+
+@plugin.setup()
+def create_replica_sessionmaker(
+        connection_config: ConnectionConfig.Value,
+        primary_engine: setup_engine.Result
+) -> ReplicaSessionmaker:
+    engine = primary_engine
+    if Config.replica_url:
+        engine = create_async_engine(
+            Config.replica_url,
+            **connection_config.model_dump(
+                exclude_defaults=True,
+                exclude={'kwargs', 'expire_on_commit', 'url'}
+            ),
+            **connection_config.kwargs
+        )
+        LifecycleModule.get().on_stop(engine.dispose)
+
+    return ReplicaSessionmaker(
+        bind=engine,
+        autoflush=False,
+        expire_on_commit=False,
+        class_=AsyncSession
+    )
+
+
+@asynccontextmanager
+async def replica_session() -> AsyncIterator[AsyncSession]:
+    async with get_replica_sessionmaker()() as session:
+        with session_context.use(session):
+            yield session
+
+
+def read_only(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    primary_func = transaction(0)(func)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs) -> T:
+        # Nested calls keep the caller's session so that they see its own uncommitted writes.
+        if not Config.replica_url or session_context.get(None) is not None:
+            return await primary_func(*args, **kwargs)
+
+        async with replica_session():
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def get_replica_sessionmaker() -> ReplicaSessionmaker:
+    return DependenciesModule.get().resolve(ReplicaSessionmaker)
@@ -0,0 +1,94 @@
+import asyncio
+import contextlib
+import os
+import random
+import socket
+import time
+import uuid
+from functools import wraps
+from typing import Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+from rewire import config, logger
+
+from src import redis
+
+OWNER_ID = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+@config(fallback={})
+class Config(BaseModel):
+    lease_ttl: float = 30.0
+    shards: int = 8
+
+
+class Lease:
+    def __init__(self, name: str, ttl: float, hold: float = 0.0):
+        self.name = name
+        self.ttl = ttl
+        self.hold = hold
+        self.acquired = False
+        self.started_at: Optional[float] = None
+        self.renew_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> 'Lease':
+        self.acquired = await redis.acquire_lease(self.name, OWNER_ID, max(self.ttl, self.hold))
+        if self.acquired:
+            self.started_at = time.monotonic()
+            self.renew_task = asyncio.create_task(self.renew())
+
+        return self
+
+    async def __aexit__(self, *_):
+        if not self.acquired:
+            return
+
+        # A renewal still in flight would otherwise shorten the hold below.
+        self.renew_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.renew_task
+
+        # Keeping the lease until the hold time passes stops replicas whose trigger fires a bit later from rerunning the job.
+        remaining = self.hold - (time.monotonic() - self.started_at)
+        if remaining > 0:
+            await redis.renew_lease(self.name, OWNER_ID, remaining)
+        else:
+            await redis.release_lease(self.name, OWNER_ID)
+
+    async def renew(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            if not await redis.renew_lease(self.name, OWNER_ID, self.ttl):
+                logger.warning(f'Lost the lease {self.name} while still running')
+                return
+
+
+def run_once(hold: float = 0.0):
+    def decorator(func: Callable[[], Awaitable]) -> Callable[[], Awaitable]:
+        @wraps(func)
+        async def wrapper():
+            async with Lease(f'job:{func.__name__}', Config.lease_ttl, hold) as lease:
+                if not lease.acquired:
+                    logger.debug(f'Job {func.__name__} is already running on another replica')
+                    return
+
+                return await func()
+
+        return wrapper
+
+    return decorator
+
+
+def sharded(hold: float = 0.0):
+    def decorator(func: Callable[[int, int], Awaitable]) -> Callable[[], Awaitable]:
+        @wraps(func)
+        async def wrapper():
+            shards = Config.shards
+            for shard in random.sample(range(shards), shards):
+                async with Lease(f'job:{func.__name__}:{shard}', Config.lease_ttl, hold) as lease:
+                    if lease.acquired:
+                        await func(shard, shards)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,71 @@
+import time
+from typing import List, Tuple
+
+from maxapi.types import LinkButton
+from maxapi.utils.inline_keyboard import InlineKeyboardBuilder
+from pydantic import BaseModel
+from rewire import config
+from rewire_sqlmodel import transaction
+
+from src import redis, sender, metrics
+from src.models import User, Mailing
+
+
+@config(fallback={})
+class Config(BaseModel):
+    delay: float = 60.0
+    batch_size: int = 1000
+
+
+async def schedule_user_mailings(user_ids: List[int], challenge_id: str):
+    await redis.add_due_mailings({user_id: challenge_id for user_id in user_ids}, time.time() + Config.delay)
+
+
+async def enqueue_user_mailing(user_id: int, mailing: Mailing):
+    inline_keyboard = InlineKeyboardBuilder()
+    inline_keyboard.add(LinkButton(
+        text=mailing.button_text,
+        url=mailing.button_url
+    ))
+
+    await sender.enqueue_user_message(
+        user_id,
+        mailing.message_text,
+        inline_keyboard.as_markup()
+    )
+
+
+@metrics.job
+async def deliver_due_mailings() -> int:
+    due_mailings = await redis.pop_due_mailings(time.time(), Config.batch_size)
+    if not due_mailings:
+        return 0
+
+    return await deliver_mailings(due_mailings)
+
+
+@transaction(0)
+async def deliver_mailings(due_mailings: List[Tuple[int, str]]) -> int:
+    mailings_by_challenge = {mailing.challenge_id: mailing for mailing in await Mailing.get_all()}
+
+    sent_count = 0
+    while due_mailings:
+        current_challenge_ids = await User.get_current_challenge_ids([user_id for user_id, _ in due_mailings])
+        user_mailings = [
+            (user_id, mailings_by_challenge[challenge_id])
+            for user_id, challenge_id in due_mailings
+            if challenge_id in mailings_by_challenge and current_challenge_ids.get(user_id) == challenge_id
+        ]
+        mailings_by_id = {mailing.id: mailing for _, mailing in user_mailings}
+
+        sent_mailings = await redis.set_users_mailing_sent([(user_id, mailing.id) for user_id, mailing in user_mailings])
+        for user_id, mailing_id in sent_mailings:
+            await enqueue_user_mailing(user_id, mailings_by_id[mailing_id])
+
+        sent_count += len(sent_mailings)
+        if len(due_mailings) < Config.batch_size:
+            break
+
+        due_mailings = await redis.pop_due_mailings(time.time(), Config.batch_size)
+
+    return sent_count
@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Union, List, Dict, Optional
 
 from maxapi import Router, Dispatcher
 from maxapi.enums.intent import Intent
@@ -9,8 +9,8 @@ from maxapi.utils.inline_keyboard import InlineKeyboardBuilder
 from rewire import simple_plugin
 from rewire_sqlmodel import transaction
 
-from src import redis
-from src.models import User, Challenge
+from src import redis, catalog, mailings, database
+from src.models import User
 from src.utils import create_app_url
 
 plugin = simple_plugin()
@@ -48,8 +48,20 @@ async def start_command(event: Union[BotStarted, MessageCreated]):
     )
 
 
+@database.read_only
+async def get_user_names(user_ids: List[int]) -> Dict[int, Optional[str]]:
+    user_names = await redis.get_user_names(user_ids)
+
+    missing_ids = [user_id for user_id, name in user_names.items() if name is None]
+    if missing_ids:
+        stored_names = await User.get_names(missing_ids)
+        await redis.set_user_names(stored_names)
+        user_names.update(stored_names)
+
+    return user_names
+
+
 @router.message_callback(RatingPayload.filter())
-@transaction(0)
 async def rating_callback(event: MessageCallback):
     user_scores = await redis.get_scores_leaderboard(limit=5)
     user_place = await redis.get_user_place(event.from_user.user_id)
@@ -65,14 +77,10 @@ async def rating_callback(event: MessageCallback):
 
     rating_text_parts = []
     if user_scores:
-        top_users = []
-        for user_id, score in user_scores.items():
-            user = await User.get(user_id)
-            top_users.append((user, score))
-
+        user_names = await get_user_names(list(user_scores))
         rating_text = '\n'.join(
-            f'{index}) {user.name}: {score}%'
-            for index, (user, score) in enumerate(top_users, start=1)
+            f'{index}) {user_names.get(user_id)}: {score}%'
+            for index, (user_id, score) in enumerate(user_scores.items(), start=1)
         )
 
         rating_text_parts.append('Рейтинг точности среди создателей доступных городов:\n')
@@ -107,15 +115,19 @@ async def rating_callback(event: MessageCallback):
 @transaction(0)
 async def next_challenge_callback(event: MessageCallback):
     user = await User.get(event.from_user.user_id)
-    if not user.current_challenge:
-        user.current_challenge = await Challenge.get_next()
+    challenge = user.current_challenge_id and await catalog.get_challenge(user.current_challenge_id)
+    if not challenge:
+        challenge = await catalog.get_next_challenge()
+        user.current_challenge_id = challenge.id
         user.add()
 
+        await mailings.schedule_user_mailings([user.id], challenge.id)
+
     inline_keyboard = InlineKeyboardBuilder()
     inline_keyboard.add(LinkButton(text='Открыть', url=create_app_url(event.bot.me.username)))
 
     result = await event.message.answer(
-        user.current_challenge.description,
+        challenge.description,
         attachments=[inline_keyboard.as_markup()]
     )
 
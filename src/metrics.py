@@ -0,0 +1,265 @@
+import collections
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from apscheduler.events import EVENT_JOB_SUBMITTED, JobSubmissionEvent
+from apscheduler.schedulers.base import BaseScheduler
+from fastapi import APIRouter, FastAPI, Request, Response
+from maxapi import Dispatcher
+from maxapi.filters.middleware import BaseMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from pydantic import BaseModel
+from rewire import config, simple_plugin, logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+plugin = simple_plugin()
+router = APIRouter()
+
+T = TypeVar('T')
+
+
+@config(fallback={})
+class Config(BaseModel):
+    statement_budget: int = 10
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency',
+    ['method', 'route', 'status']
+)
+HTTP_REQUEST_ERRORS = Counter(
+    'http_request_errors_total', 'HTTP requests failed with a server error',
+    ['method', 'route']
+)
+
+REDIS_CALL_DURATION = Histogram(
+    'redis_call_duration_seconds', 'Redis helper latency',
+    ['call'], buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0)
+)
+REDIS_CALL_ERRORS = Counter('redis_call_errors_total', 'Redis helper failures', ['call'])
+
+DB_QUERY_DURATION = Histogram(
+    'db_query_duration_seconds', 'Database statement latency',
+    ['statement'], buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5)
+)
+DB_QUERY_ERRORS = Counter('db_query_errors_total', 'Failed database statements', ['statement'])
+DB_TRANSACTION_DURATION = Histogram('db_transaction_duration_seconds', 'Database transaction duration', ['outcome'])
+DB_STATEMENTS = Histogram(
+    'db_statements_per_unit', 'Database statements issued per HTTP request or bot update',
+    ['unit'], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+)
+
+BOT_CALL_DURATION = Histogram('bot_api_call_duration_seconds', 'MAX Bot API call latency', ['method'])
+BOT_CALL_ERRORS = Counter('bot_api_call_errors_total', 'Failed MAX Bot API calls', ['method'])
+
+JOB_DURATION = Histogram(
+    'scheduler_job_duration_seconds', 'Scheduler job runtime',
+    ['job'], buckets=(.1, .5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+)
+JOB_LAG = Histogram(
+    'scheduler_job_lag_seconds', 'Delay between the scheduled and the actual job start',
+    ['job'], buckets=(.01, .05, .1, .5, 1.0, 5.0, 15.0, 60.0)
+)
+JOB_ERRORS = Counter('scheduler_job_errors_total', 'Failed scheduler job runs', ['job'])
+JOB_ITEMS = Counter('scheduler_job_items_total', 'Items processed by scheduler jobs', ['job'])
+JOB_LAST_SUCCESS = Gauge('scheduler_job_last_success_timestamp_seconds', 'Last successful job run', ['job'])
+
+
+@contextmanager
+def measure(duration: Histogram, errors: Counter, label: str):
+    started_at = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        errors.labels(label).inc()
+        raise
+    finally:
+        duration.labels(label).observe(time.perf_counter() - started_at)
+
+
+def instrument(duration: Histogram, errors: Counter, label: Optional[str] = None):
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            with measure(duration, errors, label or func.__name__):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+redis_call = instrument(REDIS_CALL_DURATION, REDIS_CALL_ERRORS)
+
+
+def bot_call(method: str):
+    return measure(BOT_CALL_DURATION, BOT_CALL_ERRORS, method)
+
+
+def job(func: Callable[..., Awaitable[Optional[int]]]) -> Callable[..., Awaitable[Optional[int]]]:
+    @wraps(func)
+    async def wrapper(*args, **kwargs) -> Optional[int]:
+        with measure(JOB_DURATION, JOB_ERRORS, func.__name__):
+            items = await func(*args, **kwargs)
+
+        JOB_ITEMS.labels(func.__name__).inc(items or 0)
+        JOB_LAST_SUCCESS.labels(func.__name__).set_to_current_time()
+        return items
+
+    return wrapper
+
+
+def instrument_scheduler(scheduler: BaseScheduler):
+    def on_job_submitted(job_event: JobSubmissionEvent):
+        now = time.time()
+        for scheduled_run_time in job_event.scheduled_run_times:
+            JOB_LAG.labels(job_event.job_id).observe(max(now - scheduled_run_time.timestamp(), 0.0))
+
+    scheduler.add_listener(on_job_submitted, EVENT_JOB_SUBMITTED)
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def most_repeated(self) -> str:
+        statement, count = collections.Counter(self.statements).most_common(1)[0]
+        return f'{count}x {" ".join(statement.split())[:200]}'
+
+
+statement_counter: ContextVar[Optional[StatementCounter]] = ContextVar('statement_counter', default=None)
+
+
+@contextmanager
+def count_statements() -> Iterator[StatementCounter]:
+    counter = StatementCounter()
+    token = statement_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        statement_counter.reset(token)
+        parent = statement_counter.get()
+        if parent is not None:
+            parent.statements += counter.statements
+
+
+@contextmanager
+def assert_max_statements(max_count: int) -> Iterator[StatementCounter]:
+    with count_statements() as counter:
+        yield counter
+
+    if counter.count > max_count:
+        raise AssertionError(
+            f'Expected at most {max_count} statements, got {counter.count}:\n' + '\n'.join(counter.statements)
+        )
+
+
+def check_statement_budget(unit: str, counter: StatementCounter):
+    DB_STATEMENTS.labels(unit).observe(counter.count)
+    if counter.count > Config.statement_budget:
+        logger.warning(
+            f'{unit} issued {counter.count} database statements (budget {Config.statement_budget}), '
+            f'most repeated: {counter.most_repeated()}'
+        )
+
+
+class StatementBudgetMiddleware(BaseMiddleware):
+    async def __call__(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]], event_object: Any, data: Dict[str, Any]) -> Any:
+        with count_statements() as counter:
+            try:
+                return await handler(event_object, data)
+            finally:
+                check_statement_budget(f'bot {type(event_object).__name__}', counter)
+
+
+def get_statement_label(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def on_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started_at', []).append(time.perf_counter())
+
+    counter = statement_counter.get()
+    if counter is not None:
+        counter.statements.append(statement)
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def on_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = conn.info['query_started_at'].pop()
+    DB_QUERY_DURATION.labels(get_statement_label(statement)).observe(time.perf_counter() - started_at)
+
+
+@event.listens_for(Engine, 'handle_error')
+def on_handle_error(context):
+    started_at = context.connection.info.get('query_started_at') if context.connection is not None else None
+    if started_at:
+        started_at.pop()
+
+    DB_QUERY_ERRORS.labels(get_statement_label(context.statement or '')).inc()
+
+
+@event.listens_for(Session, 'after_begin')
+def on_transaction_begin(session: Session, transaction, connection):
+    session.info.setdefault('transaction_started_at', time.perf_counter())
+
+
+def observe_transaction(session: Session, outcome: str):
+    started_at = session.info.pop('transaction_started_at', None)
+    if started_at is not None:
+        DB_TRANSACTION_DURATION.labels(outcome).observe(time.perf_counter() - started_at)
+
+
+@event.listens_for(Session, 'after_commit')
+def on_transaction_commit(session: Session):
+    observe_transaction(session, 'commit')
+
+
+@event.listens_for(Session, 'after_rollback')
+def on_transaction_rollback(session: Session):
+    observe_transaction(session, 'rollback')
+
+
+async def track_http_request(request: Request, call_next) -> Response:
+    started_at = time.perf_counter()
+    status = '500'
+    with count_statements() as counter:
+        try:
+            response = await call_next(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            route = request.scope.get('route')
+            route_path = route.path if route else 'unmatched'
+
+            HTTP_REQUEST_DURATION.labels(request.method, route_path, status).observe(time.perf_counter() - started_at)
+            if status.startswith('5'):
+                HTTP_REQUEST_ERRORS.labels(request.method, route_path).inc()
+
+            check_statement_budget(f'{request.method} {route_path}', counter)
+
+
+@router.get('/metrics', include_in_schema=False)
+async def get_metrics() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@plugin.setup()
+def setup_metrics(app: FastAPI):
+    app.middleware('http')(track_http_request)
+    app.include_router(router)
+
+
+@plugin.setup()
+def setup_dispatcher_metrics(dispatcher: Dispatcher):
+    dispatcher.middleware(StatementBudgetMiddleware())
@@ -1,10 +1,25 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, AsyncIterator, NamedTuple, Type, TypeVar
 
 from pydantic import BaseModel
-from rewire_sqlmodel import SQLModel, transaction
-from sqlalchemy import BigInteger
-from sqlmodel import Field, Relationship
+from rewire_sqlmodel import SQLModel, transaction, session_context
+from sqlalchemy import BigInteger, Select, update
+from sqlmodel import Field, Relationship, select
+
+from src.cache import user_cache
+
+P = TypeVar('P', bound=tuple)
+
+
+def project(model: Type[SQLModel], projection: Type[P]) -> Select:
+    # A plain Select keeps single-column results as rows, sqlmodel's select would unwrap them into scalars.
+    return Select(*(getattr(model, field) for field in projection._fields))
+
+
+class UserScan(NamedTuple):
+    id: int
+    current_challenge_id: Optional[str]
+    last_completed_at: Optional[datetime]
 
 
 class User(SQLModel, table=True):
@@ -19,11 +34,15 @@ class User(SQLModel, table=True):
     last_challenge_message_id: Optional[str] = None
     received_certificate: bool = False
 
-    current_challenge_id: Optional[str] = Field(default=None, foreign_key='challenge.id')
+    current_challenge_id: Optional[str] = Field(default=None, foreign_key='challenge.id', index=True)
     current_challenge: Optional['Challenge'] = Relationship(
         sa_relationship_kwargs={'lazy': 'selectin'}
     )
 
+    def add(self):
+        invalidate_cached_user(self.id)
+        return super().add()
+
     @property
     def next_challenge_ready(self) -> bool:
         return not self.last_completed_at or self.last_completed_at.date() < datetime.now().date()
@@ -36,15 +55,86 @@ class User(SQLModel, table=True):
     async def get_all(cls, **kwargs) -> List['User']:
         return list(await cls.select().filter_by(**kwargs).all())
 
+    @classmethod
+    async def get_projections(cls, projection: Type[P], *conditions: Any) -> List[P]:
+        rows = await session_context.get().exec(project(cls, projection).where(*conditions).order_by(cls.id))
+        return list(map(projection._make, rows))
+
+    @classmethod
+    async def iter_chunks(
+            cls,
+            projection: Type[P] = UserScan,
+            chunk_size: int = 1000,
+            shard: int = 0,
+            shards: int = 1,
+            where: Optional[Any] = None
+    ) -> AsyncIterator[List[P]]:
+        session = session_context.get()
+        last_id = None
+
+        while True:
+            query = project(cls, projection).order_by(cls.id).limit(chunk_size)
+            if shards > 1:
+                query = query.where(cls.id % shards == shard)
+            if where is not None:
+                query = query.where(where)
+            if last_id is not None:
+                query = query.where(cls.id > last_id)
+
+            rows = list(map(projection._make, await session.exec(query)))
+            if not rows:
+                return
+
+            yield rows
+
+            if len(rows) < chunk_size:
+                return
+
+            last_id = rows[-1].id
+
+    @classmethod
+    async def update_many(cls, user_ids: List[int], *conditions: Any, **values: Any) -> List[int]:
+        if not user_ids:
+            return []
+
+        for user_id in user_ids:
+            invalidate_cached_user(user_id)
+
+        result = await session_context.get().exec(
+            update(cls).where(cls.id.in_(user_ids), *conditions).values(**values).returning(cls.id)
+        )
+        return list(result.scalars())
+
+    @classmethod
+    async def get_current_challenge_ids(cls, user_ids: List[int]) -> Dict[int, Optional[str]]:
+        if not user_ids:
+            return {}
+
+        rows = await session_context.get().exec(select(cls.id, cls.current_challenge_id).where(cls.id.in_(user_ids)))
+        return {user_id: challenge_id for user_id, challenge_id in rows}
+
+    @classmethod
+    async def get_names(cls, user_ids: List[int]) -> Dict[int, str]:
+        if not user_ids:
+            return {}
+
+        rows = await session_context.get().exec(select(cls.id, cls.name).where(cls.id.in_(user_ids)))
+        return {user_id: name for user_id, name in rows}
+
     @classmethod
     @transaction(0)
     async def get_or_create(cls, user_id: int, **kwargs) -> 'User':
         return await cls.get(user_id) or cls(id=user_id, **kwargs).add()
 
 
+def invalidate_cached_user(user_id: int):
+    user_cache.invalidate(user_id)
+    session_context.get().sync_session.info.setdefault('changed_user_ids', set()).add(user_id)
+
+
 class ChallengeElement(SQLModel, table=True):
     id: str = Field(primary_key=True)
-    challenge_id: str = Field(foreign_key='challenge.id')
+    challenge_id: str = Field(foreign_key='challenge.id', index=True)
     name: str
     width: float
     target_x: float
@@ -57,6 +147,7 @@ class Challenge(SQLModel, table=True):
     description: str
     scene_width: float
     scene_height: float
+    ordinal: int = Field(index=True, unique=True)
 
     elements: List[ChallengeElement] = Relationship(
         cascade_delete=True,
@@ -67,13 +158,6 @@ class Challenge(SQLModel, table=True):
     async def get_by_id(cls, challenge_id: str) -> Optional['Challenge']:
         return await cls.select().where(cls.id == challenge_id).first()
 
-    @classmethod
-    async def get_next(cls, completed_ids: Optional[List[str]] = None) -> Optional['Challenge']:
-        if not completed_ids:
-            return await cls.select().first()
-
-        return await cls.select().where(cls.id.not_in(completed_ids)).first()
-
 
 class Mailing(SQLModel, table=True):
     id: int = Field(primary_key=True, sa_column_kwargs={'autoincrement': True})
@@ -140,3 +224,22 @@ class CompleteChallengeRequest(BaseModel):
 
 class CompleteChallengeResponse(BaseModel):
     ok: bool
+
+
+class LeaderboardEntry(BaseModel):
+    place: int
+    user_id: int
+    name: Optional[str]
+    score: float
+
+
+class LeaderboardResponse(BaseModel):
+    total: int
+    entries: List[LeaderboardEntry]
+    next_cursor: Optional[int]
+    user_place: Optional[int]
+    around: List[LeaderboardEntry]
+
+
+class WebhookResponse(BaseModel):
+    ok: bool
@@ -1,11 +1,112 @@
-from typing import Dict, Optional, List
+from functools import cache
+from typing import Dict, Optional, List, Tuple
 
 from pydantic import BaseModel
 from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
 from rewire import simple_plugin, DependenciesModule, config
 
+from src import metrics
+from src.models import LeaderboardEntry
+
 plugin = simple_plugin()
 
+SUBMIT_SCORE_SCRIPT = '''
+local previous = redis.call('HGET', KEYS[1], ARGV[2])
+local score = tonumber(ARGV[3])
+
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    local total, count = 0, 0
+    for _, value in ipairs(redis.call('HVALS', KEYS[1])) do
+        total = total + tonumber(value)
+        count = count + 1
+    end
+    redis.call('HSET', KEYS[2], 'sum', tostring(total), 'count', tostring(count))
+end
+
+if not previous then
+    redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+    redis.call('HINCRBYFLOAT', KEYS[2], 'sum', ARGV[3])
+    redis.call('HINCRBY', KEYS[2], 'count', 1)
+elseif tonumber(previous) <= score then
+    redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+    redis.call('HINCRBYFLOAT', KEYS[2], 'sum', tostring(score - tonumber(previous)))
+end
+
+local stats = redis.call('HMGET', KEYS[2], 'sum', 'count')
+local average = math.floor(tonumber(stats[1]) / tonumber(stats[2]) * 10 + 0.5) / 10
+
+redis.call('ZADD', KEYS[3], tostring(average), ARGV[1])
+if ARGV[4] ~= '' then
+    redis.call('HSET', KEYS[4], ARGV[1], ARGV[4])
+end
+
+return {previous or false, tostring(average), redis.call('ZREVRANK', KEYS[3], ARGV[1])}
+'''
+
+RENEW_LEASE_SCRIPT = '''
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+'''
+
+RELEASE_LEASE_SCRIPT = '''
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+'''
+
+POP_DUE_SCRIPT = '''
+local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #items > 0 then
+    redis.call('ZREM', KEYS[1], unpack(items))
+end
+return items
+'''
+
+LEADERBOARD_SCRIPT = '''
+local function get_entries(start, stop)
+    local entries = {}
+    if stop < start then
+        return entries
+    end
+
+    local items = redis.call('ZREVRANGE', KEYS[1], start, stop, 'WITHSCORES')
+    if #items == 0 then
+        return entries
+    end
+
+    local user_ids = {}
+    for index = 1, #items, 2 do
+        table.insert(user_ids, items[index])
+    end
+
+    local names = redis.call('HMGET', KEYS[2], unpack(user_ids))
+    for index, user_id in ipairs(user_ids) do
+        table.insert(entries, {start + index - 1, user_id, items[index * 2], names[index]})
+    end
+
+    return entries
+end
+
+local start = tonumber(ARGV[1])
+local page = get_entries(start, start + tonumber(ARGV[2]) - 1)
+
+local place = false
+local around = {}
+if ARGV[3] ~= '' then
+    place = redis.call('ZREVRANK', KEYS[1], ARGV[3])
+    if place then
+        local window = tonumber(ARGV[4])
+        around = get_entries(math.max(place - window, 0), place + window)
+    end
+end
+
+return {redis.call('ZCARD', KEYS[1]), page, place, around}
+'''
+
 
 @config
 class Config(BaseModel):
@@ -21,47 +122,196 @@ def get_redis() -> Redis:
     return DependenciesModule.get().resolve(Redis)
 
 
-async def set_user_score(user_id: int, score: float):
+@cache
+def get_script(source: str) -> AsyncScript:
+    return get_redis().register_script(source)
+
+
+@metrics.redis_call
+async def set_user_names(user_names: Dict[int, str]):
+    if not user_names:
+        return
+
     redis = get_redis()
-    await redis.zadd('user:ratings', {str(user_id): score})
+    await redis.hset('user:names', mapping={str(user_id): name for user_id, name in user_names.items()})
+
 
+@metrics.redis_call
+async def get_user_names(user_ids: List[int]) -> Dict[int, Optional[str]]:
+    if not user_ids:
+        return {}
 
+    redis = get_redis()
+    names = await redis.hmget('user:names', [str(user_id) for user_id in user_ids])
+    return dict(zip(user_ids, names))
+
+
+@metrics.redis_call
 async def get_user_place(user_id: int) -> Optional[int]:
     redis = get_redis()
     return await redis.zrevrank('user:ratings', user_id)
 
 
+@metrics.redis_call
 async def get_scores_leaderboard(limit: int = 10) -> Dict[int, float]:
     redis = get_redis()
     user_scores = await redis.zrevrange('user:ratings', 0, limit - 1, withscores=True)
     return {int(user_id): float(score) for user_id, score in user_scores}
 
 
-async def set_user_challenge_score(user_id: int, challenge_id: str, score: float):
+@metrics.redis_call
+async def get_leaderboard(
+        start: int,
+        limit: int,
+        user_id: Optional[int] = None,
+        window: int = 0
+) -> Tuple[int, List[LeaderboardEntry], Optional[int], List[LeaderboardEntry]]:
     redis = get_redis()
-    await redis.hset(f'user:{user_id}:ratings', challenge_id, str(score))
+    total, page, user_place, around = await get_script(LEADERBOARD_SCRIPT)(
+        keys=['user:ratings', 'user:names'],
+        args=[start, limit, '' if user_id is None else user_id, window],
+        client=redis
+    )
+
+    def parse_entries(entries: list) -> List[LeaderboardEntry]:
+        return [
+            LeaderboardEntry.model_construct(place=place + 1, user_id=int(entry_user_id), score=float(score), name=name)
+            for place, entry_user_id, score, name in entries
+        ]
 
+    return int(total), parse_entries(page), None if user_place is None else int(user_place), parse_entries(around)
 
-async def get_user_challenge_score(user_id: int, challenge_id: str) -> Optional[float]:
+
+@metrics.redis_call
+async def submit_user_challenge_score(
+        user_id: int,
+        challenge_id: str,
+        score: float,
+        name: Optional[str] = None
+) -> Tuple[Optional[float], float, int]:
     redis = get_redis()
-    score = await redis.hget(f'user:{user_id}:ratings', challenge_id)
-    return float(score) if score else None
+    previous_score, average_score, user_place = await get_script(SUBMIT_SCORE_SCRIPT)(
+        keys=[f'user:{user_id}:ratings', f'user:{user_id}:ratings:stats', 'user:ratings', 'user:names'],
+        args=[user_id, challenge_id, score, name or ''],
+        client=redis
+    )
+
+    return float(previous_score) if previous_score else None, float(average_score), int(user_place)
 
 
+@metrics.redis_call
 async def get_user_completed_challenges(user_id: int) -> List[str]:
     redis = get_redis()
     return await redis.hkeys(f'user:{user_id}:ratings')
 
 
-async def get_user_average_score(user_id: int) -> float:
+@metrics.redis_call
+async def get_users_completed_challenges(user_ids: List[int]) -> Dict[int, List[str]]:
+    if not user_ids:
+        return {}
+
     redis = get_redis()
-    user_scores = await redis.hvals(f'user:{user_id}:ratings')
+    async with redis.pipeline(transaction=False) as pipe:
+        for user_id in user_ids:
+            pipe.hkeys(f'user:{user_id}:ratings')
+
+        results = await pipe.execute()
 
-    scores = [float(score) for score in user_scores]
-    return round(sum(scores) / len(scores), 1) if user_scores else 0.0
+    return dict(zip(user_ids, results))
+
+
+@metrics.redis_call
+async def set_users_mailing_sent(user_mailings: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    if not user_mailings:
+        return []
+
+    redis = get_redis()
+    async with redis.pipeline(transaction=False) as pipe:
+        for user_id, mailing_id in user_mailings:
+            pipe.set(f'user:{user_id}:mailing:{mailing_id}', '1', nx=True)
+
+        results = await pipe.execute()
+
+    return [user_mailing for user_mailing, was_set in zip(user_mailings, results) if was_set]
+
+
+@metrics.redis_call
+async def add_due_mailings(user_challenges: Dict[int, str], due_at: float):
+    if not user_challenges:
+        return
+
+    redis = get_redis()
+    await redis.zadd('mailings:due', {
+        f'{user_id}:{challenge_id}': due_at
+        for user_id, challenge_id in user_challenges.items()
+    })
+
+
+@metrics.redis_call
+async def pop_due_mailings(now: float, limit: int) -> List[Tuple[int, str]]:
+    redis = get_redis()
+    items = await get_script(POP_DUE_SCRIPT)(keys=['mailings:due'], args=[now, limit], client=redis)
+
+    user_challenges = []
+    for item in items:
+        user_id, challenge_id = item.split(':', 1)
+        user_challenges.append((int(user_id), challenge_id))
+
+    return user_challenges
+
+
+@metrics.redis_call
+async def add_due_deletions(message_ids: List[str], due_at: float):
+    if not message_ids:
+        return
+
+    redis = get_redis()
+    await redis.zadd('deletions:due', {message_id: due_at for message_id in message_ids})
+
+
+@metrics.redis_call
+async def pop_due_deletions(now: float, limit: int) -> List[str]:
+    redis = get_redis()
+    return await get_script(POP_DUE_SCRIPT)(keys=['deletions:due'], args=[now, limit], client=redis)
+
+
+@metrics.redis_call
+async def get_challenges_version() -> Optional[str]:
+    redis = get_redis()
+    return await redis.get('challenges:version')
+
+
+@metrics.redis_call
+async def mark_users_written(user_ids: List[int], window: float, ttl: float):
+    redis = get_redis()
+    async with redis.pipeline(transaction=False) as pipe:
+        for user_id in user_ids:
+            pipe.incr(f'user:{user_id}:version')
+            pipe.pexpire(f'user:{user_id}:version', int(ttl * 1000))
+            pipe.set(f'user:{user_id}:written', 1, px=int(window * 1000))
+        await pipe.execute()
+
+
+@metrics.redis_call
+async def get_user_version(user_id: int) -> Tuple[int, bool]:
+    redis = get_redis()
+    version, written = await redis.mget(f'user:{user_id}:version', f'user:{user_id}:written')
+    return int(version or 0), written is not None
+
+
+@metrics.redis_call
+async def acquire_lease(name: str, owner: str, ttl: float) -> bool:
+    redis = get_redis()
+    return bool(await redis.set(f'lease:{name}', owner, nx=True, px=int(ttl * 1000)))
+
+
+@metrics.redis_call
+async def renew_lease(name: str, owner: str, ttl: float) -> bool:
+    redis = get_redis()
+    return bool(await get_script(RENEW_LEASE_SCRIPT)(keys=[f'lease:{name}'], args=[owner, int(ttl * 1000)], client=redis))
 
 
-async def set_user_mailing_sent(user_id: int, mailing_id: int) -> bool:
+@metrics.redis_call
+async def release_lease(name: str, owner: str) -> bool:
     redis = get_redis()
-    was_sent = await redis.set(f'user:{user_id}:mailing:{mailing_id}', '1', get=True)
-    return was_sent == '1'
+    return bool(await get_script(RELEASE_LEASE_SCRIPT)(keys=[f'lease:{name}'], args=[owner], client=redis))
@@ -0,0 +1,63 @@
+from functools import lru_cache
+from typing import Dict
+
+import msgpack
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+JSON_MEDIA_TYPE = 'application/json'
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, 'application/x-msgpack')
+JSON_MEDIA_RANGES = (JSON_MEDIA_TYPE, 'application/*', '*/*')
+
+
+@lru_cache(maxsize=256)
+def parse_accept(accept: str) -> Dict[str, float]:
+    qualities = {}
+    for media_range in accept.split(','):
+        media_type, *params = media_range.split(';')
+        media_type = media_type.strip().lower()
+        if not media_type:
+            continue
+
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        qualities[media_type] = max(quality, qualities.get(media_type, 0.0))
+
+    return qualities
+
+
+def accepts_msgpack(request: Request) -> bool:
+    qualities = parse_accept(request.headers.get('accept', ''))
+    msgpack_quality = max(qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    json_quality = max(qualities.get(media_type, 0.0) for media_type in JSON_MEDIA_RANGES)
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+def encode_json(content: BaseModel) -> bytes:
+    return content.__pydantic_serializer__.to_json(content)
+
+
+def encode_msgpack(content: BaseModel) -> bytes:
+    return msgpack.packb(content.model_dump())
+
+
+def encoded_response(request: Request, json_body: bytes, msgpack_body: bytes) -> Response:
+    if accepts_msgpack(request):
+        return Response(msgpack_body, media_type=MSGPACK_MEDIA_TYPE, headers={'Vary': 'Accept'})
+
+    return Response(json_body, media_type=JSON_MEDIA_TYPE, headers={'Vary': 'Accept'})
+
+
+def encode_response(request: Request, content: BaseModel) -> Response:
+    if accepts_msgpack(request):
+        return Response(encode_msgpack(content), media_type=MSGPACK_MEDIA_TYPE, headers={'Vary': 'Accept'})
+
+    return Response(encode_json(content), media_type=JSON_MEDIA_TYPE, headers={'Vary': 'Accept'})
@@ -1,43 +1,87 @@
 import asyncio
+import time
 from datetime import datetime
-from typing import Annotated, Optional
+from typing import Annotated, List, Optional
 
-from fastapi import APIRouter, FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, BackgroundTasks, Response, Query, Request
 from fastapi.security import APIKeyHeader
 from maxapi.enums.attachment import AttachmentType
 from maxapi.enums.intent import Intent
 from maxapi.types import CallbackButton
 from maxapi.types.attachments import Image
 from maxapi.utils.inline_keyboard import InlineKeyboardBuilder
-from rewire import simple_plugin, logger
+from pydantic import BaseModel
+from rewire import simple_plugin, config
 from rewire_fastapi import Dependable
 from rewire_sqlmodel import transaction
 
-from src import redis, bot
-from src.bot import Config
+from src import redis, bot, sender, catalog, uploads, responses, database, user_versions
 from src.main_flow import OpenChallengePayload, RatingPayload
-from src.models import User, ChallengeResponse, ChallengeElementResponse, CompleteChallengeRequest, CompleteChallengeResponse, Challenge
-from src.utils import parse_init_data_unsafe, validate_init_data, create_certificate_image
+from src.models import (
+    User, InitData, ChallengeResponse, CompleteChallengeRequest, CompleteChallengeResponse,
+    LeaderboardEntry, LeaderboardResponse
+)
+from src.cache import TTLCache
+from src.utils import parse_init_data_unsafe, validate_init_data, render_certificate_image
 
 plugin = simple_plugin()
 router = APIRouter()
 
-MAX_ERROR = 2000
+LAST_MESSAGE_DELETE_DELAY = 1
 
 
-@Dependable
-@transaction(0)
-async def user_dependency(init_data_str: Annotated[str, Depends(APIKeyHeader(name='X-Init-Data'))]) -> Optional[User]:
+@config(fallback={})
+class Config(BaseModel):
+    init_data_cache_size: int = 10000
+    init_data_cache_ttl: int = 600
+    init_data_max_age: int = 86400
+    leaderboard_max_limit: int = 100
+    leaderboard_max_window: int = 10
+
+
+init_data_cache: TTLCache[str, InitData] = TTLCache(Config.init_data_cache_size)
+
+
+def get_verified_init_data(init_data_str: str) -> InitData:
+    init_data = init_data_cache.get(init_data_str)
+    if init_data:
+        return init_data
+
+    init_data = parse_init_data_unsafe(init_data_str)
+    validate_init_data(init_data, bot.Config.init_data_tokens)
+
+    init_data_cache.set(
+        init_data_str, init_data,
+        expires_at=min(time.time() + Config.init_data_cache_ttl, init_data.auth_date + Config.init_data_max_age)
+    )
+    return init_data
+
+
+def get_init_data_user_id(init_data_str: str) -> int:
     try:
-        init_data = parse_init_data_unsafe(init_data_str)
-        validate_init_data(init_data, Config.token)
+        init_data = get_verified_init_data(init_data_str)
     except ValueError as e:
         raise HTTPException(status_code=401, detail='Invalid init data!') from e
 
     if not init_data.user:
         raise HTTPException(status_code=401, detail='No user in the init data!')
 
-    user = await User.get(init_data.user.id)
+    return init_data.user.id
+
+
+@Dependable
+@transaction(0)
+async def user_dependency(init_data_str: Annotated[str, Depends(APIKeyHeader(name='X-Init-Data'))]) -> Optional[User]:
+    user = await User.get(get_init_data_user_id(init_data_str))
+    if not user:
+        raise HTTPException(status_code=401, detail='No user found for this init data!')
+
+    return user
+
+
+@Dependable
+async def cached_user_dependency(init_data_str: Annotated[str, Depends(APIKeyHeader(name='X-Init-Data'))]) -> Optional[User]:
+    user = await user_versions.get_cached_user(get_init_data_user_id(init_data_str))
     if not user:
         raise HTTPException(status_code=401, detail='No user found for this init data!')
 
@@ -45,52 +89,39 @@ async def user_dependency(init_data_str: Annotated[str, Depends(APIKeyHeader(nam
 
 
 @router.get('/api/challenges', response_model=ChallengeResponse)
-@transaction(0)
-async def get_challenge(user: user_dependency.Result) -> ChallengeResponse:
-    if not user.current_challenge:
+@database.read_only
+async def get_challenge(http_request: Request, user: cached_user_dependency.Result) -> Response:
+    challenge = user.current_challenge_id and await catalog.get_challenge(user.current_challenge_id)
+    if not challenge:
         raise HTTPException(status_code=400, detail='No current challenge available!')
 
-    return ChallengeResponse(
-        **user.current_challenge.model_dump(),
-        elements=[
-            ChallengeElementResponse(**element.model_dump())
-            for element in user.current_challenge.elements
-        ]
-    )
+    return responses.encoded_response(http_request, challenge.response_json, challenge.response_msgpack)
 
 
 @router.post('/api/challenges/complete', response_model=CompleteChallengeResponse)
 @transaction(0)
-async def complete_challenge(request: CompleteChallengeRequest, user: user_dependency.Result, background_tasks: BackgroundTasks):
-    if not user.current_challenge:
+async def complete_challenge(
+        http_request: Request,
+        request: CompleteChallengeRequest,
+        user: user_dependency.Result,
+        background_tasks: BackgroundTasks
+) -> Response:
+    challenge = user.current_challenge_id and await catalog.get_challenge(user.current_challenge_id)
+    if not challenge:
         raise HTTPException(status_code=400, detail='No current challenge available!')
 
-    current_score = await redis.get_user_challenge_score(user.id, user.current_challenge_id)
-    if not current_score:
-        user.last_completed_at = datetime.now()
-
     if user.last_challenge_message_id:
-        await asyncio.sleep(1)
-        await bot.delete_user_message(user.last_challenge_message_id)
+        await sender.delete_user_message_later(user.last_challenge_message_id, LAST_MESSAGE_DELETE_DELAY)
         user.last_challenge_message_id = None
 
-    placed_elements = {element.id: element for element in request.placed_elements}
-    total_error = sum(
-        abs(placed_elements[element.id].x - element.target_x) +
-        abs(placed_elements[element.id].y - element.target_y)
-        for element in user.current_challenge.elements
-        if element.id in placed_elements
+    scorer = await catalog.get_challenge_scorer(challenge.id)
+    final_score = scorer.score(request.placed_elements)
+    current_score, average_score, _ = await redis.submit_user_challenge_score(
+        user.id, user.current_challenge_id, final_score, user.name
     )
 
-    for element in user.current_challenge.elements:
-        logger.info(f'{element.target_x},{element.target_y} | {placed_elements[element.id].x},{placed_elements[element.id].y}')
-
-    final_score = round(max(0.0, 1 - min(total_error / MAX_ERROR, 1.0)) * 100, 1)
-    if not current_score or current_score <= final_score:
-        await redis.set_user_challenge_score(user.id, user.current_challenge_id, final_score)
-
-    average_score = await redis.get_user_average_score(user.id)
-    await redis.set_user_score(user.id, average_score)
+    if not current_score:
+        user.last_completed_at = datetime.now()
 
     user.average_score = average_score
     user.add()
@@ -100,7 +131,42 @@ async def complete_challenge(request: CompleteChallengeRequest, user: user_depen
         user, final_score
     )
 
-    return CompleteChallengeResponse(ok=True)
+    return responses.encode_response(http_request, CompleteChallengeResponse(ok=True))
+
+
+@router.get('/api/leaderboard', response_model=LeaderboardResponse)
+@database.read_only
+async def get_leaderboard(
+        http_request: Request,
+        user: cached_user_dependency.Result,
+        cursor: Annotated[int, Query(ge=0)] = 0,
+        limit: Annotated[int, Query(ge=1, le=Config.leaderboard_max_limit)] = 20,
+        window: Annotated[int, Query(ge=0, le=Config.leaderboard_max_window)] = 2
+) -> Response:
+    total, entries, user_place, around = await redis.get_leaderboard(cursor, limit, user.id, window)
+    await fill_missing_names(entries + around)
+
+    next_cursor = cursor + len(entries)
+    return responses.encode_response(http_request, LeaderboardResponse.model_construct(
+        total=total,
+        entries=entries,
+        next_cursor=next_cursor if next_cursor < total else None,
+        user_place=None if user_place is None else user_place + 1,
+        around=around
+    ))
+
+
+async def fill_missing_names(entries: List[LeaderboardEntry]):
+    missing_ids = list({entry.user_id for entry in entries if entry.name is None})
+    if not missing_ids:
+        return
+
+    stored_names = await User.get_names(missing_ids)
+    await redis.set_user_names(stored_names)
+
+    for entry in entries:
+        if entry.name is None:
+            entry.name = stored_names.get(entry.user_id)
 
 
 @transaction(0)
@@ -114,7 +180,7 @@ async def send_complete_challenge_message(user: User, score: float):
     else:
         result_text = f'Первые шаги сделаны — {score}% доступности 🌱\nПопробуй завтра добиться большего!'
 
-    await bot.send_user_message(user.id, result_text)
+    await sender.send_user_message(user.id, result_text)
     await asyncio.sleep(3)
 
     inline_keyboard = InlineKeyboardBuilder()
@@ -122,8 +188,8 @@ async def send_complete_challenge_message(user: User, score: float):
     inline_keyboard.row(CallbackButton(text='Вернуться к уровню', payload=OpenChallengePayload().pack(), intent=Intent.POSITIVE))
 
     completed_ids = await redis.get_user_completed_challenges(user.id)
-    if await Challenge.get_next(completed_ids):
-        await bot.send_user_message(
+    if await catalog.get_next_challenge(completed_ids):
+        await sender.send_user_message(
             user.id,
             'Возвращайся завтра — тебя ждёт новая локация и новые вызовы!\n'
             'Каждый день приближает тебя к городу без барьеров.',
@@ -134,8 +200,9 @@ async def send_complete_challenge_message(user: User, score: float):
             user.received_certificate = True
             user.add()
 
-            payload = await bot.upload_image(create_certificate_image(user.name, user.average_score))
-            await bot.send_user_message(
+            certificate_image = await render_certificate_image(user.name, user.average_score)
+            payload = await uploads.upload_image(certificate_image, 'certificate.png')
+            await sender.send_user_message(
                 user.id,
                 'Ты — настоящий гений доступности!\n'
                 'Твой город теперь открыт для всех — и это твоя заслуга.\n'
@@ -147,7 +214,7 @@ async def send_complete_challenge_message(user: User, score: float):
             )
 
         await asyncio.sleep(3)
-        await bot.send_user_message(
+        await sender.send_user_message(
             user.id,
             'Уровней больше нет — ты прошёл все доступные испытания! 🎉\n'
             'Но не расслабляйся — иногда здесь появляются новые локации, задания и полезные рассылки.\n'
@@ -1,76 +1,130 @@
+from collections import defaultdict
+from datetime import date, datetime, time
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from maxapi.enums.intent import Intent
-from maxapi.types import CallbackButton, LinkButton
+from maxapi.types import CallbackButton
 from maxapi.utils.inline_keyboard import InlineKeyboardBuilder
-from rewire import simple_plugin
+from pydantic import BaseModel
+from rewire import simple_plugin, config
 from rewire_sqlmodel import transaction, session_context
+from sqlalchemy import and_, or_
 
-from src import redis, bot
+from src import redis, sender, catalog, metrics, jobs, mailings, database
 from src.main_flow import OpenChallengePayload
-from src.models import User, Challenge, Mailing
+from src.models import User, Mailing
 
 plugin = simple_plugin()
 
+MAILINGS_INTERVAL = 3600
+DUE_MAILINGS_INTERVAL = 5
+DUE_DELETIONS_INTERVAL = 1
+NOTIFICATIONS_HOLD = 3600
+
+
+@config(fallback={})
+class Config(BaseModel):
+    chunk_size: int = 1000
+
+
+@jobs.sharded(hold=MAILINGS_INTERVAL / 2)
+@metrics.job
+@database.read_only
+async def send_user_mailings(shard: int, shards: int) -> int:
+    all_mailings = await Mailing.get_all()
+    mailings_by_id = {mailing.id: mailing for mailing in all_mailings}
+    mailings_by_challenge = {mailing.challenge_id: mailing for mailing in all_mailings}
+    if not mailings_by_challenge:
+        return 0
+
+    sent_count = 0
+    users_chunks = User.iter_chunks(
+        chunk_size=Config.chunk_size,
+        shard=shard,
+        shards=shards
+    )
+
+    async for users in users_chunks:
+        user_mailings = [
+            (user.id, mailings_by_challenge[user.current_challenge_id].id)
+            for user in users
+            if user.current_challenge_id in mailings_by_challenge
+        ]
+
+        # Enqueueing can wait on the sender's rate limit, so the chunk's transaction is not kept open meanwhile.
+        await session_context.get().commit()
 
-@transaction(0)
-async def send_user_mailings():
-    mailings = await Mailing.get_all()
-    mailings_by_challenge = {mailing.challenge_id: mailing for mailing in mailings}
-
-    for user in await User.get_all():
-        if not user.current_challenge_id:
-            continue
-
-        mailing = mailings_by_challenge.get(user.current_challenge_id)
-        if not mailing or await redis.set_user_mailing_sent(user.id, mailing.id):
-            continue
-
-        inline_keyboard = InlineKeyboardBuilder()
-        inline_keyboard.add(LinkButton(
-            text=mailing.button_text,
-            url=mailing.button_url
-        ))
-
-        await bot.send_user_message(
-            user.id,
-            mailing.message_text,
-            inline_keyboard.as_markup()
-        )
+        user_mailings = await redis.set_users_mailing_sent(user_mailings)
+        sent_count += len(user_mailings)
+
+        for user_id, mailing_id in user_mailings:
+            await mailings.enqueue_user_mailing(user_id, mailings_by_id[mailing_id])
+
+    return sent_count
 
 
+@jobs.run_once(hold=NOTIFICATIONS_HOLD)
+@metrics.job
 @transaction(0)
-async def send_challenge_notifications():
+async def send_challenge_notifications() -> int:
     inline_keyboard = InlineKeyboardBuilder()
     inline_keyboard.add(CallbackButton(text='Вперёд!', payload=OpenChallengePayload().pack(), intent=Intent.POSITIVE))
 
-    for user in await User.get_all():
-        if not user.current_challenge_id or not user.next_challenge_ready:
-            continue
+    users_chunks = User.iter_chunks(
+        chunk_size=Config.chunk_size,
+        where=and_(
+            User.current_challenge_id.is_not(None),
+            or_(User.last_completed_at.is_(None), User.last_completed_at < datetime.combine(date.today(), time.min))
+        )
+    )
+
+    notified_count = 0
+    async for users in users_chunks:
+        completed_challenges = await redis.get_users_completed_challenges([user.id for user in users])
+
+        advancements = defaultdict(list)
+        for user in users:
+            completed_ids = completed_challenges[user.id]
+            if user.current_challenge_id not in completed_ids:
+                continue
+
+            next_challenge = await catalog.get_next_challenge(completed_ids)
+            if next_challenge:
+                advancements[user.current_challenge_id, next_challenge.id].append(user.id)
+
+        advanced_ids = defaultdict(list)
+        for (current_challenge_id, next_challenge_id), user_ids in advancements.items():
+            advanced_ids[next_challenge_id] += await User.update_many(
+                user_ids,
+                User.current_challenge_id == current_challenge_id,
+                last_completed_at=None,
+                current_challenge_id=next_challenge_id
+            )
 
-        completed_ids = await redis.get_user_completed_challenges(user.id)
-        if user.current_challenge_id not in completed_ids:
-            continue
+        await session_context.get().commit()
 
-        next_challenge = await Challenge.get_next(completed_ids)
-        if not next_challenge:
-            continue
+        for next_challenge_id, user_ids in advanced_ids.items():
+            notified_count += len(user_ids)
+            await mailings.schedule_user_mailings(user_ids, next_challenge_id)
 
-        user.last_completed_at = None
-        user.current_challenge = next_challenge
-        user.add()
+            for user_id in user_ids:
+                await sender.enqueue_user_message(
+                    user_id,
+                    'Доброе утро! Сегодня тебя ждёт новая локация.\n'
+                    'Готов продолжить строить город без барьеров?',
+                    inline_keyboard.as_markup()
+                )
 
-        await session_context.get().commit()
-        await bot.send_user_message(
-            user.id,
-            'Доброе утро! Сегодня тебя ждёт новая локация.\n'
-            'Готов продолжить строить город без барьеров?',
-            inline_keyboard.as_markup()
-        )
+    return notified_count
 
 
 @plugin.run()
 async def start_schedules():
     scheduler = AsyncIOScheduler()
-    scheduler.add_job(send_user_mailings, 'interval', minutes=1)
-    scheduler.add_job(send_challenge_notifications, 'cron', hour=10, minute=0)
+    metrics.instrument_scheduler(scheduler)
+
+    scheduler.add_job(mailings.deliver_due_mailings, 'interval', seconds=DUE_MAILINGS_INTERVAL, id='deliver_due_mailings')
+    scheduler.add_job(sender.deliver_due_deletions, 'interval', seconds=DUE_DELETIONS_INTERVAL, id='deliver_due_deletions')
+    scheduler.add_job(send_user_mailings, 'interval', seconds=MAILINGS_INTERVAL, id='send_user_mailings')
+    scheduler.add_job(send_challenge_notifications, 'cron', hour=10, minute=0, id='send_challenge_notifications')
     scheduler.start()
@@ -0,0 +1,104 @@
+import math
+from typing import Dict, Iterable, List, Literal, Protocol, Sequence
+
+import numpy as np
+from pydantic import BaseModel
+from rewire import config
+
+# Below this many elements a plain loop beats the NumPy setup cost for a single submission.
+PYTHON_SCORE_MAX_ELEMENTS = 64
+
+
+class ScoringConfig(BaseModel):
+    metric: Literal['l1', 'l2'] = 'l1'
+    max_error: float = 2000.0
+    tolerance: float = 0.0
+    normalize: bool = False
+    weights: Dict[str, float] = {}
+
+
+@config(fallback={})
+class Config(ScoringConfig):
+    pass
+
+
+class TargetElement(Protocol):
+    id: str
+    target_x: float
+    target_y: float
+
+
+class PlacedElement(Protocol):
+    id: str
+    x: float
+    y: float
+
+
+class CompiledChallenge:
+    def __init__(
+            self,
+            elements: Sequence[TargetElement],
+            scene_width: float,
+            scene_height: float,
+            scoring_config: ScoringConfig = Config
+    ):
+        self.config = scoring_config
+        self.indexes = {element.id: index for index, element in enumerate(elements)}
+        self.targets = np.array([(element.target_x, element.target_y) for element in elements], dtype=np.float64).reshape(-1, 2)
+        self.weights = np.array([scoring_config.weights.get(element.id, 1.0) for element in elements], dtype=np.float64)
+        self.scale = np.array((scene_width, scene_height) if scoring_config.normalize else (1.0, 1.0), dtype=np.float64)
+        self.use_numpy = len(elements) > PYTHON_SCORE_MAX_ELEMENTS
+        self.element_targets = [
+            (element.target_x, element.target_y, scoring_config.weights.get(element.id, 1.0))
+            for element in elements
+        ]
+
+    def positions(self, placed_elements: Iterable[PlacedElement]) -> np.ndarray:
+        positions = np.full(self.targets.shape, np.nan)
+        for element in placed_elements:
+            index = self.indexes.get(element.id)
+            if index is not None:
+                positions[index] = (element.x, element.y)
+
+        return positions
+
+    def score(self, placed_elements: Iterable[PlacedElement]) -> float:
+        if self.use_numpy:
+            return self.score_many([placed_elements])[0]
+
+        positions = {}
+        for element in placed_elements:
+            index = self.indexes.get(element.id)
+            if index is not None:
+                positions[index] = (element.x, element.y)
+
+        scale_x, scale_y = self.scale.tolist()
+        total_error = 0.0
+        for index, (x, y) in sorted(positions.items()):
+            target_x, target_y, weight = self.element_targets[index]
+            delta_x = abs(x - target_x) / scale_x
+            delta_y = abs(y - target_y) / scale_y
+            error = math.hypot(delta_x, delta_y) if self.config.metric == 'l2' else delta_x + delta_y
+            if math.isnan(error):
+                continue
+
+            total_error += max(error - self.config.tolerance, 0.0) * weight
+
+        return round(max(0.0, 1 - min(total_error / self.config.max_error, 1.0)) * 100, 1)
+
+    def score_many(self, submissions: Iterable[Iterable[PlacedElement]]) -> List[float]:
+        positions = [self.positions(placed_elements) for placed_elements in submissions]
+        if not positions:
+            return []
+
+        deltas = np.abs(np.stack(positions) - self.targets) / self.scale
+        if self.config.metric == 'l2':
+            errors = np.sqrt(np.square(deltas).sum(axis=2))
+        else:
+            errors = deltas.sum(axis=2)
+
+        errors = np.nan_to_num(np.maximum(errors - self.config.tolerance, 0.0), nan=0.0)
+        total_errors = errors @ self.weights
+
+        scores = np.maximum(0.0, 1 - np.minimum(total_errors / self.config.max_error, 1.0)) * 100
+        return [round(float(score), 1) for score in scores]
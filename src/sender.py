@@ -0,0 +1,114 @@
+import asyncio
+import time
+from functools import partial
+from typing import Awaitable, Callable
+
+from maxapi.types import Attachment
+from pydantic import BaseModel
+from rewire import config, simple_plugin, DependenciesModule, LifecycleModule, logger
+
+from src import bot, metrics, redis
+
+plugin = simple_plugin()
+
+Job = Callable[[], Awaitable]
+
+
+@config(fallback={})
+class Config(BaseModel):
+    workers: int = 16
+    rate: float = 30.0
+    burst: int = 30
+    queue_size: int = 10000
+    drain_timeout: float = 10.0
+    deletions_batch_size: int = 1000
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Sender:
+    def __init__(self, workers: int, rate: float, burst: int, queue_size: int):
+        self.workers = workers
+        self.bucket = TokenBucket(rate, burst)
+        self.queue: asyncio.Queue[Job] = asyncio.Queue(queue_size)
+
+    async def enqueue(self, job: Job):
+        await self.queue.put(job)
+
+    async def join(self, timeout: float):
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f'Stopping with {self.queue.qsize()} outbound jobs still queued')
+
+    async def run(self):
+        await asyncio.gather(*(self.worker() for _ in range(self.workers)))
+
+    async def worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.bucket.acquire()
+                await job()
+            except Exception as e:
+                logger.error(f'Failed to run outbound job: {e}')
+            finally:
+                self.queue.task_done()
+
+
+@plugin.setup()
+async def create_sender() -> Sender:
+    sender = Sender(Config.workers, Config.rate, Config.burst, Config.queue_size)
+    # Stop hooks run before the workers are cancelled, so queued messages are still sent.
+    LifecycleModule.get().on_stop(partial(sender.join, Config.drain_timeout))
+    return sender
+
+
+@plugin.run()
+async def start_sender(sender: Sender):
+    await sender.run()
+
+
+async def enqueue_user_message(user_id: int, text: str, *attachments: Attachment):
+    await get_sender().enqueue(partial(bot.send_user_message, user_id, text, *attachments))
+
+
+async def delete_user_message_later(message_id: str, delay: float):
+    # Delayed deletions are kept in Redis, so they survive restarts and are picked up by any replica.
+    await redis.add_due_deletions([message_id], time.time() + delay)
+
+
+@metrics.job
+async def deliver_due_deletions() -> int:
+    message_ids = await redis.pop_due_deletions(time.time(), Config.deletions_batch_size)
+    for message_id in message_ids:
+        await get_sender().enqueue(partial(bot.delete_user_message, message_id))
+
+    return len(message_ids)
+
+
+async def send_user_message(user_id: int, text: str, *attachments: Attachment):
+    await get_sender().bucket.acquire()
+    await bot.send_user_message(user_id, text, *attachments)
+
+
+def get_sender() -> Sender:
+    return DependenciesModule.get().resolve(Sender)
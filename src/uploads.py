@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import mimetypes
+import random
+import time
+from typing import Dict
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, FormData, TCPConnector
+from maxapi.enums.upload_type import UploadType
+from maxapi.types import OtherAttachmentPayload
+from maxapi.types.errors import Error
+from pydantic import BaseModel, Field
+from rewire import config, simple_plugin, DependenciesModule, LifecycleModule, logger
+
+from src import bot, metrics
+from src.cache import TTLCache
+
+plugin = simple_plugin()
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+@config(fallback={})
+class Config(BaseModel):
+    concurrency: int = 4
+    attempts: int = Field(default=3, ge=1)
+    backoff: float = 0.5
+    timeout: float = 30.0
+    token_cache_size: int = 1000
+    token_ttl: float = 86400.0
+
+
+class UploadedPhoto(BaseModel):
+    token: str
+
+
+class UploadResult(BaseModel):
+    photos: Dict[str, UploadedPhoto]
+
+
+class TransientUploadError(Exception):
+    pass
+
+
+class Uploader:
+    def __init__(self, session: ClientSession, concurrency: int, attempts: int, backoff: float, token_cache_size: int):
+        self.session = session
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.attempts = attempts
+        self.backoff = backoff
+        self.payloads: TTLCache[str, OtherAttachmentPayload] = TTLCache(token_cache_size)
+        self.pending: Dict[str, asyncio.Task] = {}
+
+    async def upload_image(self, image: bytes, filename: str) -> OtherAttachmentPayload:
+        digest = hashlib.sha256(image).hexdigest()
+        payload = self.payloads.get(digest)
+        if payload:
+            return payload
+
+        # Identical images uploaded at the same time share a single upload.
+        task = self.pending.get(digest)
+        if task is None:
+            task = asyncio.create_task(self.upload_new_image(digest, image, filename))
+            self.pending[digest] = task
+            task.add_done_callback(lambda _: self.pending.pop(digest, None))
+
+        return await asyncio.shield(task)
+
+    async def upload_new_image(self, digest: str, image: bytes, filename: str) -> OtherAttachmentPayload:
+        async with self.semaphore:
+            for attempt in range(1, self.attempts + 1):
+                try:
+                    payload = await self.try_upload_image(image, filename)
+                    break
+                except (ClientError, asyncio.TimeoutError, TransientUploadError) as e:
+                    if attempt == self.attempts:
+                        raise
+
+                    delay = self.backoff * 2 ** (attempt - 1) * random.uniform(1, 1.5)
+                    logger.warning(f'Failed to upload {filename} (attempt {attempt}): {e}, retrying in {delay:.1f}s')
+                    await asyncio.sleep(delay)
+
+        self.payloads.set(digest, payload, expires_at=time.time() + Config.token_ttl)
+        return payload
+
+    async def try_upload_image(self, image: bytes, filename: str) -> OtherAttachmentPayload:
+        with metrics.bot_call('get_upload_url'):
+            upload_url = await bot.get_bot().get_upload_url(UploadType.IMAGE)
+
+        if isinstance(upload_url, Error):
+            raise TransientUploadError(f'Failed to get an upload url: {upload_url}')
+
+        form = FormData()
+        form.add_field('data', image, filename=filename, content_type=mimetypes.guess_type(filename)[0] or 'image/*')
+
+        with metrics.bot_call('upload_file'):
+            async with self.session.post(upload_url.url, data=form) as response:
+                if response.status in RETRY_STATUSES:
+                    raise TransientUploadError(f'Upload server responded with {response.status}')
+                if not response.ok:
+                    raise ValueError(f'Upload server rejected {filename} with {response.status}')
+
+                upload_result = UploadResult.model_validate(await response.json(content_type=None))
+
+        if not upload_result.photos:
+            raise ValueError(f'Upload server returned no photos for {filename}')
+
+        photo = next(iter(upload_result.photos.values()))
+        return OtherAttachmentPayload(token=photo.token, url=upload_url.url)
+
+
+@plugin.setup()
+async def create_uploader() -> Uploader:
+    session = ClientSession(
+        connector=TCPConnector(limit=Config.concurrency),
+        timeout=ClientTimeout(total=Config.timeout)
+    )
+    LifecycleModule.get().on_stop(session.close)
+
+    return Uploader(session, Config.concurrency, Config.attempts, Config.backoff, Config.token_cache_size)
+
+
+async def upload_image(image: bytes, filename: str = 'image.png') -> OtherAttachmentPayload:
+    return await get_uploader().upload_image(image, filename)
+
+
+def get_uploader() -> Uploader:
+    return DependenciesModule.get().resolve(Uploader)
@@ -0,0 +1,60 @@
+import asyncio
+import time
+from typing import Optional, List, Set
+
+from rewire import logger
+from rewire_sqlmodel import transaction
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src import database, redis
+from src.cache import user_cache, Config as CacheConfig
+from src.models import User
+
+pending_tasks: Set[asyncio.Task] = set()
+
+
+@database.read_only
+async def get_replica_user(user_id: int) -> Optional[User]:
+    return await User.get(user_id)
+
+
+@transaction(0)
+async def get_primary_user(user_id: int) -> Optional[User]:
+    return await User.get(user_id)
+
+
+async def get_cached_user(user_id: int) -> Optional[User]:
+    # The version is read before the user so that a write committed in between bumps it past the cached entry.
+    version, recently_written = await redis.get_user_version(user_id)
+    entry = user_cache.get(user_id)
+    if entry is not None and entry[1] == version:
+        return entry[0]
+
+    # The replica may not have caught up with a recent write yet.
+    user = await (get_primary_user if recently_written else get_replica_user)(user_id)
+    if user:
+        user_cache.set(user_id, (user, version), expires_at=time.time() + CacheConfig.user_cache_ttl)
+
+    return user
+
+
+async def mark_users_written(user_ids: List[int]):
+    try:
+        await redis.mark_users_written(user_ids, CacheConfig.user_write_window, CacheConfig.user_cache_ttl * 2)
+    except Exception as e:
+        logger.error(f'Failed to publish changes of users {user_ids}: {e}')
+
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_changed_users(session: Session):
+    user_ids = session.info.pop('changed_user_ids', None)
+    if not user_ids:
+        return
+
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+
+    task = asyncio.get_running_loop().create_task(mark_users_written(list(user_ids)))
+    pending_tasks.add(task)
+    task.add_done_callback(pending_tasks.discard)
@@ -1,15 +1,28 @@
+import asyncio
 import hashlib
 import hmac
+import io
 import json
-import tempfile
+import threading
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Sequence, Union
 
 from PIL import Image, ImageDraw, ImageFont
+from pydantic import BaseModel
 
 from src.models import InitData
 
 CERTIFICATE_IMAGE_PATH = 'assets/certificate.png'
 FONT_FILE_PATH = 'assets/Montserrat.ttf'
+CERTIFICATE_RENDER_WORKERS = 2
+CERTIFICATE_COMPRESS_LEVEL = 3
+
+certificate_executor = ThreadPoolExecutor(CERTIFICATE_RENDER_WORKERS, thread_name_prefix='certificate')
+certificate_thread_local = threading.local()
+
+DATA_CHECK_KEYS = sorted(key for key in InitData.model_fields if key != 'hash')
 
 
 def create_app_url(bot_username: str):
@@ -30,39 +43,66 @@ def parse_init_data_unsafe(init_data_str: str) -> InitData:
     return InitData(**parsed_data)
 
 
-def validate_init_data(init_data: InitData, bot_token: str):
-    raw_data = init_data.model_dump()
-    secret_key = hmac.new(
+@lru_cache(maxsize=16)
+def get_secret_key(bot_token: str) -> bytes:
+    return hmac.new(
         key=b'WebAppData',
         msg=bot_token.encode(),
         digestmod=hashlib.sha256
     ).digest()
 
-    data_check_pairs = []
-    for key, value in sorted(raw_data.items()):
-        if key == 'hash':
-            continue
 
-        if isinstance(value, dict):
-            value = json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+def get_data_check_string(init_data: InitData) -> str:
+    data_check_pairs = []
+    for key in DATA_CHECK_KEYS:
+        value = getattr(init_data, key)
+        if isinstance(value, BaseModel):
+            value = value.model_dump_json()
 
         data_check_pairs.append(f'{key}={value}')
 
-    data_check_string = '\n'.join(data_check_pairs)
-    calculated_hash = hmac.new(
-        key=secret_key,
-        msg=data_check_string.encode(),
-        digestmod=hashlib.sha256
-    ).hexdigest()
+    return '\n'.join(data_check_pairs)
+
+
+def validate_init_data(init_data: InitData, bot_token: Union[str, Sequence[str]]):
+    bot_tokens = [bot_token] if isinstance(bot_token, str) else bot_token
+    data_check_string = get_data_check_string(init_data).encode()
+
+    for token in bot_tokens:
+        calculated_hash = hmac.new(
+            key=get_secret_key(token),
+            msg=data_check_string,
+            digestmod=hashlib.sha256
+        ).hexdigest()
+
+        if hmac.compare_digest(calculated_hash, init_data.hash):
+            return
+
+    raise ValueError(f'Invalid init data: {init_data.hash}!')
+
+
+@lru_cache(maxsize=1)
+def get_certificate_base_image() -> Image.Image:
+    return Image.open(CERTIFICATE_IMAGE_PATH).convert('RGBA')
+
+
+def get_certificate_font() -> ImageFont.FreeTypeFont:
+    # FreeType faces are not thread-safe, so every renderer thread keeps its own.
+    if not hasattr(certificate_thread_local, 'font'):
+        certificate_thread_local.font = ImageFont.truetype(FONT_FILE_PATH, 36)
+
+    return certificate_thread_local.font
+
 
-    if calculated_hash != init_data.hash:
-        raise ValueError(f'Invalid init data: {calculated_hash} | {init_data.hash}!')
+async def render_certificate_image(user_name: str, user_score: float) -> bytes:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(certificate_executor, create_certificate_image, user_name, user_score)
 
 
-def create_certificate_image(user_name: str, user_score: float) -> str:
-    base_image = Image.open(CERTIFICATE_IMAGE_PATH).convert('RGBA')
+def create_certificate_image(user_name: str, user_score: float) -> bytes:
+    base_image = get_certificate_base_image().copy()
     draw = ImageDraw.Draw(base_image)
-    font = ImageFont.truetype(FONT_FILE_PATH, 36)
+    font = get_certificate_font()
 
     certificate_text = (
         f'Сертификат подтверждает, что {user_name}\n'
@@ -108,6 +148,6 @@ def create_certificate_image(user_name: str, user_score: float) -> str:
 
         offset_y += line_height
 
-    tmp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-    base_image.save(tmp_file.name)
-    return tmp_file.name
+    image_buffer = io.BytesIO()
+    base_image.save(image_buffer, format='PNG', compress_level=CERTIFICATE_COMPRESS_LEVEL)
+    return image_buffer.getvalue()
@@ -0,0 +1,94 @@
+import asyncio
+import hmac
+from typing import Annotated, Optional, Set
+
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Request
+from maxapi import Bot, Dispatcher
+from maxapi.methods.types.getted_updates import process_update_webhook
+from rewire import simple_plugin, DependenciesModule, logger
+
+from src import bot
+from src.models import WebhookResponse
+
+plugin = simple_plugin()
+router = APIRouter()
+
+WEBHOOK_PATH = '/api/bot/webhook'
+
+
+class UpdateProcessor:
+    def __init__(self, concurrency: int, max_pending: int):
+        self.max_pending = max_pending
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.tasks: Set[asyncio.Task] = set()
+        self.ready = asyncio.Event()
+        self.bot: Optional[Bot] = None
+        self.dispatcher: Optional[Dispatcher] = None
+
+    async def start(self, bot_instance: Bot, dispatcher: Dispatcher):
+        self.bot = bot_instance
+        self.dispatcher = dispatcher
+
+        # There is no public way to prepare the dispatcher without it serving updates itself.
+        # maxapi is pinned to an exact version for this, tests/test_webhook.py checks it after upgrades.
+        await dispatcher._Dispatcher__ready(bot_instance)
+        self.ready.set()
+
+    def submit(self, event_json: dict) -> bool:
+        if len(self.tasks) >= self.max_pending:
+            return False
+
+        task = asyncio.create_task(self.process(event_json))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return True
+
+    async def process(self, event_json: dict):
+        await self.ready.wait()
+
+        async with self.semaphore:
+            try:
+                event = await process_update_webhook(event_json, self.bot)
+                await self.dispatcher.handle(event)
+            except Exception as e:
+                logger.error(f'Failed to process webhook update: {e}')
+
+
+@router.post(WEBHOOK_PATH, include_in_schema=False)
+async def receive_update(
+        request: Request,
+        secret: Annotated[Optional[str], Header(alias='X-Max-Bot-Api-Secret')] = None
+) -> WebhookResponse:
+    if not bot.Config.webhook_secret or not hmac.compare_digest(secret or '', bot.Config.webhook_secret):
+        raise HTTPException(status_code=401, detail='Invalid webhook secret!')
+
+    if not get_update_processor().submit(await request.json()):
+        raise HTTPException(status_code=503, detail='Too many pending updates!')
+
+    return WebhookResponse(ok=True)
+
+
+@plugin.setup()
+async def create_update_processor() -> UpdateProcessor:
+    return UpdateProcessor(bot.Config.webhook_concurrency, bot.Config.webhook_max_pending)
+
+
+@plugin.setup()
+def include_router(app: FastAPI):
+    if bot.Config.mode == 'webhook':
+        app.include_router(router)
+
+
+@plugin.run()
+async def start_webhook(processor: UpdateProcessor, bot_instance: Bot, dispatcher: Dispatcher):
+    if bot.Config.mode != 'webhook':
+        return
+
+    await processor.start(bot_instance, dispatcher)
+    if bot.Config.webhook_url:
+        await bot_instance.subscribe_webhook(bot.Config.webhook_url, secret=bot.Config.webhook_secret)
+        logger.info(f'Subscribed the bot to {bot.Config.webhook_url}')
+
+
+def get_update_processor() -> UpdateProcessor:
+    return DependenciesModule.get().resolve(UpdateProcessor)
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from rewire import ConfigModule, Space
+from rewire_sqlmodel import SQLModel, session_context
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+TEST_CONFIG = {'src': {'redis': {'url': 'redis://localhost:6379'}, 'bot': {'token': 'TEST_BOT_TOKEN'}}}
+
+
+async def import_app_modules():
+    # src.redis and src.bot have required config that is read at import time, so they are imported inside a space.
+    async with Space(only=[]).add(ConfigModule(config=TEST_CONFIG)).init().use():
+        import benchmarks.cases  # noqa: F401
+        import src.main_flow  # noqa: F401
+        import src.routes  # noqa: F401
+        import src.schedules  # noqa: F401
+
+
+asyncio.run(import_app_modules())
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://')
+    SQLModel.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        yield session
+
+    engine.dispose()
+
+
+@pytest.fixture
+def run(monkeypatch):
+    from src import redis
+
+    def run_test(test):
+        async def main():
+            engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+            async with engine.begin() as connection:
+                await connection.run_sync(SQLModel.metadata.create_all)
+
+            client = FakeRedis(decode_responses=True)
+            monkeypatch.setattr(redis, 'get_redis', lambda: client)
+            redis.get_script.cache_clear()
+
+            try:
+                async with AsyncSession(engine, expire_on_commit=False) as session:
+                    with session_context.use(session):
+                        return await test(session, client)
+            finally:
+                redis.get_script.cache_clear()
+                await client.aclose()
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run_test
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from benchmarks import benchmarks
+from src import redis
+
+
+@pytest.mark.parametrize('item', benchmarks, ids=[item.name for item in benchmarks])
+def test_benchmark_runs(item, monkeypatch):
+    # Redis benchmarks replace get_redis with their own client, monkeypatch restores it afterwards.
+    monkeypatch.delenv('REDIS_URL', raising=False)
+    monkeypatch.setattr(redis, 'get_redis', redis.get_redis)
+    redis.get_script.cache_clear()
+
+    async def main():
+        function = item.factory()
+        if asyncio.iscoroutine(function):
+            function = await function
+
+        assert function is not None
+        result = function()
+        if asyncio.iscoroutine(result):
+            await result
+
+    try:
+        asyncio.run(main())
+    finally:
+        redis.get_script.cache_clear()
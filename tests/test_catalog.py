@@ -0,0 +1,89 @@
+import pytest
+
+from src.catalog import ChallengeCatalog, get_first_missing_position
+from src.metrics import assert_max_statements
+from src.models import Challenge, ChallengeElement
+
+
+def add_challenge(session, challenge_id: str, ordinal: int):
+    session.add(Challenge(
+        id=challenge_id,
+        name=challenge_id,
+        description='',
+        scene_width=100,
+        scene_height=100,
+        ordinal=ordinal,
+        elements=[ChallengeElement(id=f'{challenge_id}-e1', name='Ramp', width=10, target_x=1, target_y=2)]
+    ))
+
+
+@pytest.mark.parametrize('progress, position', [
+    (0b0, 0),
+    (0b1, 1),
+    (0b10, 0),
+    (0b101, 1),
+    (0b1011, 2),
+    (0b1111, 4)
+])
+def test_get_first_missing_position(progress, position):
+    assert get_first_missing_position(progress) == position
+
+
+def test_get_next_over_progress(run):
+    async def test(session, client):
+        for ordinal, challenge_id in enumerate(['c1', 'c2', 'c3', 'c4'], start=1):
+            add_challenge(session, challenge_id, ordinal)
+        await session.commit()
+
+        catalog = ChallengeCatalog(version_check_interval=60)
+
+        assert (await catalog.get_next()).id == 'c1'
+        assert (await catalog.get_next(['c2'])).id == 'c1'
+        assert (await catalog.get_next(['c1', 'c3'])).id == 'c2'
+        assert (await catalog.get_next(['c1', 'c2', 'unknown'])).id == 'c3'
+        assert await catalog.get_next(['c4', 'c3', 'c2', 'c1']) is None
+
+    run(test)
+
+
+def test_refresh_reloads_on_version_change(run):
+    async def test(session, client):
+        add_challenge(session, 'c1', 1)
+        await session.commit()
+
+        catalog = ChallengeCatalog(version_check_interval=60)
+        assert (await catalog.get('c1')).ordinal == 1
+
+        add_challenge(session, 'c2', 2)
+        await session.commit()
+        await client.incr('challenges:version')
+
+        # Within the interval the version is not checked, so the new challenge is not loaded yet.
+        with assert_max_statements(0):
+            assert await catalog.get('c2') is None
+
+        catalog.checked_at -= 61
+        assert (await catalog.get('c2')).ordinal == 2
+        assert catalog.version == '1'
+        assert await catalog.get_scorer('c2') is not None
+
+    run(test)
+
+
+def test_refresh_keeps_catalog_when_version_is_unchanged(run):
+    async def test(session, client):
+        add_challenge(session, 'c1', 1)
+        await session.commit()
+        await client.set('challenges:version', 5)
+
+        catalog = ChallengeCatalog(version_check_interval=0)
+        await catalog.get('c1')
+        checked_at = catalog.checked_at
+
+        with assert_max_statements(0):
+            assert (await catalog.get('c1')).id == 'c1'
+
+        assert catalog.checked_at > checked_at
+        assert catalog.version == '5'
+
+    run(test)
@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+
+from src.models import Challenge
+
+
+def create_challenge(challenge_id: str, ordinal: int) -> Challenge:
+    return Challenge(id=challenge_id, name=challenge_id, description='', scene_width=100, scene_height=100, ordinal=ordinal)
+
+
+def test_challenges_sort_by_ordinal(session):
+    session.add_all([create_challenge('b', 1), create_challenge('a', 3), create_challenge('c', 2)])
+    session.commit()
+
+    assert session.exec(select(Challenge.id).order_by(Challenge.ordinal)).all() == ['b', 'c', 'a']
+
+
+def test_duplicate_ordinal_is_rejected(session):
+    session.add(create_challenge('a', 1))
+    session.commit()
+
+    session.add(create_challenge('b', 1))
+    with pytest.raises(IntegrityError):
+        session.commit()
@@ -0,0 +1,58 @@
+from rewire_sqlmodel import SQLModel, session_context
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src import database, main_flow
+from src.models import User
+
+
+async def use_replica(monkeypatch):
+    engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    sessionmaker = database.ReplicaSessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with sessionmaker() as session:
+        session.add(User(id=1, name='Replica', username=None, avatar_url=None))
+        await session.commit()
+
+    monkeypatch.setattr(database.Config, 'replica_url', 'sqlite+aiosqlite://')
+    monkeypatch.setattr(database, 'get_replica_sessionmaker', lambda: sessionmaker)
+    return engine
+
+
+@database.read_only
+async def get_user_name(user_id: int) -> str:
+    return (await User.get(user_id)).name
+
+
+def test_read_only_reuses_outer_session(run, monkeypatch):
+    async def test(session, client):
+        session.add(User(id=1, name='Primary', username=None, avatar_url=None))
+        await session.flush()
+        assert await get_user_name(1) == 'Primary'
+
+        engine = await use_replica(monkeypatch)
+        try:
+            assert await get_user_name(1) == 'Primary'
+        finally:
+            await engine.dispose()
+
+    run(test)
+
+
+def test_read_only_opens_replica_session(run, monkeypatch):
+    async def test(session, client):
+        session.add(User(id=1, name='Primary', username=None, avatar_url=None))
+        await session.commit()
+
+        engine = await use_replica(monkeypatch)
+        try:
+            with session_context.use(None):
+                assert await get_user_name(1) == 'Replica'
+                assert await main_flow.get_user_names([1]) == {1: 'Replica'}
+        finally:
+            await engine.dispose()
+
+    run(test)
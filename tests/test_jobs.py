@@ -0,0 +1,75 @@
+import asyncio
+
+from src import jobs, redis
+
+
+def test_lease_helpers(run):
+    async def test(session, client):
+        assert await redis.acquire_lease('job', 'a', 10)
+        assert not await redis.acquire_lease('job', 'b', 10)
+
+        assert not await redis.renew_lease('job', 'b', 60)
+        assert await redis.renew_lease('job', 'a', 60)
+        assert await client.pttl('lease:job') > 10000
+
+        assert not await redis.release_lease('job', 'b')
+        assert await redis.release_lease('job', 'a')
+        assert not await client.exists('lease:job')
+
+    run(test)
+
+
+def test_lease_keeps_hold_after_renewals(run):
+    async def test(session, client):
+        async with jobs.Lease('job', ttl=0.03, hold=10) as lease:
+            assert lease.acquired
+            await asyncio.sleep(0.1)
+
+        assert lease.renew_task.done()
+        assert await client.get('lease:job') == jobs.OWNER_ID
+        assert await client.pttl('lease:job') > 9000
+
+    run(test)
+
+
+def test_lease_released_without_hold(run):
+    async def test(session, client):
+        async with jobs.Lease('job', ttl=10) as lease:
+            assert lease.acquired
+            async with jobs.Lease('job', ttl=10) as other:
+                assert not other.acquired
+
+        assert not await client.exists('lease:job')
+
+    run(test)
+
+
+def test_run_once(run):
+    @jobs.run_once(hold=60)
+    async def job():
+        return 42
+
+    async def test(session, client):
+        assert await job() == 42
+        assert await job() is None
+
+    run(test)
+
+
+def test_sharded_skips_claimed_shards(run, monkeypatch):
+    monkeypatch.setattr(jobs.Config, 'shards', 4)
+    handled = []
+
+    @jobs.sharded()
+    async def job(shard: int, shards: int):
+        handled.append((shard, shards))
+
+    async def test(session, client):
+        await redis.acquire_lease('job:job:1', 'other', 60)
+        await redis.acquire_lease('job:job:3', 'other', 60)
+
+        await job()
+        assert sorted(handled) == [(0, 4), (2, 4)]
+        assert not await client.exists('lease:job:job:0')
+
+    run(test)
@@ -0,0 +1,122 @@
+import json
+
+from fastapi import Request
+
+from src import redis, routes
+from src.models import User
+
+USERS_COUNT = 5
+
+
+async def add_ranked_users(session, client):
+    # User N scores N * 10, so user 5 is first. User 2 has no cached name, user 6 is not ranked.
+    for user_id in range(1, USERS_COUNT + 2):
+        session.add(User(id=user_id, name=f'User {user_id}', username=None, avatar_url=None))
+    await session.commit()
+
+    await client.zadd('user:ratings', {str(user_id): user_id * 10 for user_id in range(1, USERS_COUNT + 1)})
+    await client.hset('user:names', mapping={
+        str(user_id): f'Cached {user_id}' for user_id in range(1, USERS_COUNT + 1) if user_id != 2
+    })
+
+
+async def get_leaderboard_response(user_id: int, cursor: int, limit: int, window: int) -> dict:
+    http_request = Request({'type': 'http', 'headers': []})
+    response = await routes.get_leaderboard(http_request, User(id=user_id, name=''), cursor, limit, window)
+    return json.loads(response.body)
+
+
+def places(entries) -> list:
+    return [(entry.place, entry.user_id) for entry in entries]
+
+
+def test_leaderboard_pages(run):
+    async def test(session, client):
+        await add_ranked_users(session, client)
+
+        total, first, _, _ = await redis.get_leaderboard(0, 2)
+        _, second, _, _ = await redis.get_leaderboard(2, 2)
+        _, last, _, _ = await redis.get_leaderboard(4, 2)
+        _, beyond, _, _ = await redis.get_leaderboard(10, 2)
+
+        assert total == USERS_COUNT
+        assert places(first) == [(1, 5), (2, 4)]
+        assert places(second) == [(3, 3), (4, 2)]
+        assert places(last) == [(5, 1)]
+        assert beyond == []
+        assert [entry.name for entry in second] == ['Cached 3', None]
+        assert [entry.score for entry in first] == [50.0, 40.0]
+
+    run(test)
+
+
+def test_leaderboard_around_window(run):
+    async def test(session, client):
+        await add_ranked_users(session, client)
+
+        _, _, top_place, top_around = await redis.get_leaderboard(0, 1, user_id=5, window=2)
+        _, _, middle_place, middle_around = await redis.get_leaderboard(0, 1, user_id=3, window=1)
+        _, _, tail_place, tail_around = await redis.get_leaderboard(0, 1, user_id=1, window=2)
+
+        assert top_place == 0
+        assert places(top_around) == [(1, 5), (2, 4), (3, 3)]
+        assert middle_place == 2
+        assert places(middle_around) == [(2, 4), (3, 3), (4, 2)]
+        assert tail_place == 4
+        assert places(tail_around) == [(3, 3), (4, 2), (5, 1)]
+
+    run(test)
+
+
+def test_leaderboard_unranked_user(run):
+    async def test(session, client):
+        await add_ranked_users(session, client)
+
+        total, entries, user_place, around = await redis.get_leaderboard(0, 2, user_id=6, window=2)
+        assert total == USERS_COUNT
+        assert places(entries) == [(1, 5), (2, 4)]
+        assert user_place is None
+        assert around == []
+
+        response = await get_leaderboard_response(6, 0, 2, 2)
+        assert response['user_place'] is None
+        assert response['around'] == []
+
+    run(test)
+
+
+def test_leaderboard_route(run):
+    async def test(session, client):
+        await add_ranked_users(session, client)
+
+        first = await get_leaderboard_response(3, 0, 3, 1)
+        last = await get_leaderboard_response(3, 3, 3, 1)
+
+        assert first['total'] == USERS_COUNT
+        assert first['next_cursor'] == 3
+        assert [entry['place'] for entry in first['entries']] == [1, 2, 3]
+        assert first['user_place'] == 3
+        assert [(entry['place'], entry['name']) for entry in first['around']] == [
+            (2, 'Cached 4'), (3, 'Cached 3'), (4, 'User 2')
+        ]
+
+        assert last['next_cursor'] is None
+        assert [(entry['place'], entry['user_id'], entry['name']) for entry in last['entries']] == [
+            (4, 2, 'User 2'), (5, 1, 'Cached 1')
+        ]
+
+    run(test)
+
+
+def test_fill_missing_names_backfills_redis(run):
+    async def test(session, client):
+        await add_ranked_users(session, client)
+        _, entries, _, _ = await redis.get_leaderboard(0, USERS_COUNT)
+
+        await routes.fill_missing_names(entries)
+
+        assert [entry.name for entry in entries] == ['Cached 5', 'Cached 4', 'Cached 3', 'User 2', 'Cached 1']
+        assert await client.hget('user:names', '2') == 'User 2'
+        assert await client.hget('user:names', '6') is None
+
+    run(test)
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from src import mailings, redis, sender
+from src.models import User, Challenge, Mailing
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    messages = []
+
+    async def enqueue_user_message(user_id, text, *attachments):
+        messages.append((user_id, text))
+
+    monkeypatch.setattr(sender, 'enqueue_user_message', enqueue_user_message)
+    monkeypatch.setattr(mailings.Config, 'batch_size', 2)
+    return messages
+
+
+async def add_users(session, current_challenge_ids):
+    for ordinal, challenge_id in enumerate(['c1', 'c2'], start=1):
+        session.add(Challenge(id=challenge_id, name=challenge_id, description='', scene_width=1, scene_height=1, ordinal=ordinal))
+        session.add(Mailing(message_text=f'Mailing {challenge_id}', button_text='Open', button_url='https://example.com', challenge_id=challenge_id))
+
+    for user_id, challenge_id in current_challenge_ids.items():
+        session.add(User(id=user_id, name=f'User {user_id}', username=None, avatar_url=None, current_challenge_id=challenge_id))
+
+    await session.commit()
+
+
+def test_pop_due_mailings_pops_only_due_entries(run):
+    async def test(session, client):
+        now = time.time()
+        await redis.add_due_mailings({1: 'c1', 2: 'c2'}, now - 1)
+        await redis.add_due_mailings({3: 'c1'}, now + 60)
+
+        assert sorted(await redis.pop_due_mailings(now, 10)) == [(1, 'c1'), (2, 'c2')]
+        assert await redis.pop_due_mailings(now, 10) == []
+        assert await client.zrange('mailings:due', 0, -1) == ['3:c1']
+
+    run(test)
+
+
+def test_rescheduled_mailing_is_queued_once(run):
+    async def test(session, client):
+        now = time.time()
+        await redis.add_due_mailings({1: 'c1'}, now - 1)
+        await redis.add_due_mailings({1: 'c1'}, now + 60)
+
+        assert await client.zcard('mailings:due') == 1
+        assert await redis.pop_due_mailings(now, 10) == []
+        assert await redis.pop_due_mailings(now + 60, 10) == [(1, 'c1')]
+
+    run(test)
+
+
+def test_deliver_skips_stale_and_sent_mailings(run, sent):
+    async def test(session, client):
+        await add_users(session, {1: 'c1', 2: 'c2', 3: 'c1'})
+        await redis.add_due_mailings({1: 'c1', 2: 'c1', 3: 'c3'}, time.time() - 1)
+
+        assert await mailings.deliver_due_mailings() == 1
+        assert sent == [(1, 'Mailing c1')]
+
+        await redis.add_due_mailings({1: 'c1'}, time.time() - 1)
+        assert await mailings.deliver_due_mailings() == 0
+        assert sent == [(1, 'Mailing c1')]
+
+    run(test)
+
+
+def test_deliver_loops_over_batches(run, sent):
+    async def test(session, client):
+        await add_users(session, {user_id: 'c1' for user_id in range(1, 6)})
+        await redis.add_due_mailings({user_id: 'c1' for user_id in range(1, 6)}, time.time() - 1)
+
+        assert await mailings.deliver_due_mailings() == 5
+        assert sorted(user_id for user_id, _ in sent) == [1, 2, 3, 4, 5]
+        assert await client.zcard('mailings:due') == 0
+
+    run(test)
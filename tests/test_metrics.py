@@ -0,0 +1,155 @@
+import time
+
+import pytest
+from fastapi import FastAPI, Response
+from prometheus_client import REGISTRY
+from sqlmodel import select
+
+from src import metrics, redis
+from src.models import User
+
+
+def get_sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def get_status(app: FastAPI, path: str) -> int:
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'headers': []}
+    statuses = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await app(scope, receive, send)
+    return statuses[0]
+
+
+def test_http_request_metrics(run):
+    async def test(session, client):
+        app = FastAPI()
+        app.middleware('http')(metrics.track_http_request)
+
+        @app.get('/users/{user_id}')
+        async def get_user(user_id: int) -> Response:
+            await session.exec(select(User.id))
+            return Response()
+
+        @app.get('/unavailable')
+        async def unavailable() -> Response:
+            return Response(status_code=503)
+
+        ok = get_sample('http_request_duration_seconds_count', method='GET', route='/users/{user_id}', status='200')
+        failed = get_sample('http_request_errors_total', method='GET', route='/unavailable')
+        unmatched = get_sample('http_request_duration_seconds_count', method='GET', route='unmatched', status='404')
+        statements = get_sample('db_statements_per_unit_sum', unit='GET /users/{user_id}')
+
+        assert await get_status(app, '/users/1') == 200
+        assert await get_status(app, '/users/2') == 200
+        assert await get_status(app, '/unavailable') == 503
+        assert await get_status(app, '/missing') == 404
+
+        assert get_sample('http_request_duration_seconds_count', method='GET', route='/users/{user_id}', status='200') == ok + 2
+        assert get_sample('http_request_errors_total', method='GET', route='/unavailable') == failed + 1
+        assert get_sample('http_request_errors_total', method='GET', route='/users/{user_id}') == 0
+        assert get_sample('http_request_duration_seconds_count', method='GET', route='unmatched', status='404') == unmatched + 1
+        assert get_sample('db_statements_per_unit_sum', unit='GET /users/{user_id}') == statements + 2
+
+    run(test)
+
+
+def test_job_metrics(run):
+    @metrics.job
+    async def metrics_test_job(items):
+        if items is None:
+            raise ValueError('failed')
+        return items
+
+    async def test(session, client):
+        started_at = time.time()
+
+        assert await metrics_test_job(3) == 3
+        assert await metrics_test_job(0) == 0
+        with pytest.raises(ValueError):
+            await metrics_test_job(None)
+
+        assert get_sample('scheduler_job_duration_seconds_count', job='metrics_test_job') == 3
+        assert get_sample('scheduler_job_items_total', job='metrics_test_job') == 3
+        assert get_sample('scheduler_job_errors_total', job='metrics_test_job') == 1
+        assert get_sample('scheduler_job_last_success_timestamp_seconds', job='metrics_test_job') >= int(started_at)
+
+    run(test)
+
+
+def test_redis_call_metrics(run):
+    @metrics.redis_call
+    async def metrics_test_call():
+        raise ConnectionError('down')
+
+    async def test(session, client):
+        calls = get_sample('redis_call_duration_seconds_count', call='get_user_place')
+        errors = get_sample('redis_call_errors_total', call='get_user_place')
+
+        assert await redis.get_user_place(1) is None
+
+        assert get_sample('redis_call_duration_seconds_count', call='get_user_place') == calls + 1
+        assert get_sample('redis_call_errors_total', call='get_user_place') == errors
+
+        with pytest.raises(ConnectionError):
+            await metrics_test_call()
+
+        assert get_sample('redis_call_duration_seconds_count', call='metrics_test_call') == 1
+        assert get_sample('redis_call_errors_total', call='metrics_test_call') == 1
+
+    run(test)
+
+
+def test_bot_call_metrics():
+    calls = get_sample('bot_api_call_duration_seconds_count', method='metrics_test_method')
+
+    with metrics.bot_call('metrics_test_method'):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.bot_call('metrics_test_method'):
+            raise RuntimeError('failed')
+
+    assert get_sample('bot_api_call_duration_seconds_count', method='metrics_test_method') == calls + 2
+    assert get_sample('bot_api_call_errors_total', method='metrics_test_method') == 1
+
+
+def test_database_metrics(session):
+    selects = get_sample('db_query_duration_seconds_count', statement='SELECT')
+    commits = get_sample('db_transaction_duration_seconds_count', outcome='commit')
+    rollbacks = get_sample('db_transaction_duration_seconds_count', outcome='rollback')
+
+    session.exec(select(User.id)).all()
+    session.commit()
+    session.exec(select(User.id)).all()
+    session.rollback()
+
+    assert get_sample('db_query_duration_seconds_count', statement='SELECT') == selects + 2
+    assert get_sample('db_transaction_duration_seconds_count', outcome='commit') == commits + 1
+    assert get_sample('db_transaction_duration_seconds_count', outcome='rollback') == rollbacks + 1
+
+
+def test_statement_budget_middleware(run):
+    class MetricsTestUpdate:
+        pass
+
+    async def test(session, client):
+        statements = get_sample('db_statements_per_unit_sum', unit='bot MetricsTestUpdate')
+
+        async def handler(event_object, data):
+            await session.exec(select(User.id))
+            await session.exec(select(User.name))
+            return 'handled'
+
+        assert await metrics.StatementBudgetMiddleware()(handler, MetricsTestUpdate(), {}) == 'handled'
+
+        assert get_sample('db_statements_per_unit_count', unit='bot MetricsTestUpdate') >= 1
+        assert get_sample('db_statements_per_unit_sum', unit='bot MetricsTestUpdate') == statements + 2
+
+    run(test)
@@ -0,0 +1,33 @@
+from typing import NamedTuple
+
+import pytest
+
+from src.metrics import assert_max_statements
+from src.models import User, UserScan, Challenge, project
+
+
+class UserId(NamedTuple):
+    id: int
+
+
+@pytest.fixture(autouse=True)
+def users(session):
+    session.add(Challenge(id='c1', name='Challenge', description='', scene_width=100, scene_height=100, ordinal=1))
+    session.add(User(id=1, name='User 1', username=None, avatar_url=None, current_challenge_id='c1'))
+    session.add(User(id=2, name='User 2', username=None, avatar_url=None))
+    session.commit()
+    session.expunge_all()
+
+
+def test_project_user_scan(session):
+    with assert_max_statements(1):
+        rows = list(map(UserScan._make, session.exec(project(User, UserScan).order_by(User.id))))
+
+    assert rows == [UserScan(1, 'c1', None), UserScan(2, None, None)]
+    assert not hasattr(rows[0], '__dict__')
+
+
+def test_project_single_field(session):
+    rows = list(map(UserId._make, session.exec(project(User, UserId).order_by(User.id))))
+
+    assert rows == [UserId(1), UserId(2)]
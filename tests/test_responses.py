@@ -0,0 +1,40 @@
+import msgpack
+import pytest
+from fastapi import Request
+
+from src import responses
+from src.models import CompleteChallengeResponse
+
+
+def create_request(accept: str) -> Request:
+    return Request({'type': 'http', 'headers': [(b'accept', accept.encode())]})
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('', False),
+    ('*/*', False),
+    ('application/json', False),
+    ('application/msgpack', True),
+    ('application/x-msgpack', True),
+    ('application/msgpack, */*', True),
+    ('application/msgpack;q=0', False),
+    ('application/msgpack; q=0.0, application/json', False),
+    ('application/json, application/msgpack;q=0.5', False),
+    ('application/json;q=0.5, application/msgpack', True),
+    ('Application/MsgPack;Q=0.9, */*;q=0.1', True),
+    ('application/msgpack;q=abc', False),
+])
+def test_accepts_msgpack(accept, expected):
+    assert responses.accepts_msgpack(create_request(accept)) is expected
+
+
+def test_encode_response():
+    content = CompleteChallengeResponse(ok=True)
+
+    json_response = responses.encode_response(create_request('application/json'), content)
+    assert json_response.body == b'{"ok":true}'
+    assert json_response.media_type == responses.JSON_MEDIA_TYPE
+
+    msgpack_response = responses.encode_response(create_request('application/msgpack'), content)
+    assert msgpack.unpackb(msgpack_response.body) == {'ok': True}
+    assert msgpack_response.headers['vary'] == 'Accept'
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, update
+from sqlmodel import select
+
+from src import catalog, redis, schedules, sender
+from src.models import User, Challenge, Mailing
+
+CHALLENGE_IDS = ['c1', 'c2', 'c3']
+
+
+@pytest.fixture
+def notifications(monkeypatch):
+    events = []
+
+    async def get_next_challenge(completed_ids):
+        return next((SimpleNamespace(id=challenge_id) for challenge_id in CHALLENGE_IDS if challenge_id not in completed_ids), None)
+
+    async def enqueue_user_message(user_id, text, *attachments):
+        events.append(('enqueue', user_id))
+
+    monkeypatch.setattr(catalog, 'get_next_challenge', get_next_challenge)
+    monkeypatch.setattr(sender, 'enqueue_user_message', enqueue_user_message)
+    monkeypatch.setattr(schedules.Config, 'chunk_size', 2)
+    return events
+
+
+async def add_users(session, client, users):
+    for ordinal, challenge_id in enumerate(CHALLENGE_IDS, start=1):
+        session.add(Challenge(id=challenge_id, name=challenge_id, description='', scene_width=1, scene_height=1, ordinal=ordinal))
+
+    for user_id, current_challenge_id, last_completed_at, completed_ids in users:
+        session.add(User(
+            id=user_id,
+            name=f'User {user_id}',
+            username=None,
+            avatar_url=None,
+            current_challenge_id=current_challenge_id,
+            last_completed_at=last_completed_at
+        ))
+        for challenge_id in completed_ids:
+            await client.hset(f'user:{user_id}:ratings', challenge_id, 50)
+
+    await session.commit()
+
+
+async def get_current_challenge_ids(session) -> dict:
+    session.expire_all()
+    return dict((await session.exec(select(User.id, User.current_challenge_id).order_by(User.id))).all())
+
+
+def test_notifications_advance_eligible_users(run, notifications):
+    async def test(session, client):
+        yesterday = datetime.now() - timedelta(days=1)
+        await add_users(session, client, [
+            (1, 'c1', yesterday, ['c1']),
+            (2, 'c1', datetime.now(), ['c1']),
+            (3, 'c1', yesterday, []),
+            (4, None, None, ['c1']),
+            (5, 'c2', None, ['c1', 'c2']),
+            (6, 'c3', yesterday, CHALLENGE_IDS)
+        ])
+
+        assert await schedules.send_challenge_notifications() == 2
+
+        assert await get_current_challenge_ids(session) == {1: 'c2', 2: 'c1', 3: 'c1', 4: None, 5: 'c3', 6: 'c3'}
+        assert sorted(user_id for _, user_id in notifications) == [1, 5]
+        assert sorted(await client.zrange('mailings:due', 0, -1)) == ['1:c2', '5:c3']
+
+    run(test)
+
+
+def test_notifications_skip_concurrently_advanced_users(run, notifications, monkeypatch):
+    async def test(session, client):
+        await add_users(session, client, [(1, 'c1', None, ['c1']), (2, 'c1', None, ['c1'])])
+        get_users_completed_challenges = redis.get_users_completed_challenges
+
+        async def advance_concurrently(user_ids):
+            # Another replica moves user 2 on between the scan and the guarded update.
+            await session.exec(update(User).where(User.id == 2).values(current_challenge_id='c3'))
+            return await get_users_completed_challenges(user_ids)
+
+        monkeypatch.setattr(redis, 'get_users_completed_challenges', advance_concurrently)
+
+        assert await schedules.send_challenge_notifications() == 1
+
+        assert await get_current_challenge_ids(session) == {1: 'c2', 2: 'c3'}
+        assert notifications == [('enqueue', 1)]
+
+    run(test)
+
+
+def test_notifications_are_enqueued_after_each_chunk_commits(run, notifications):
+    async def test(session, client):
+        await add_users(session, client, [(user_id, 'c1', None, ['c1']) for user_id in range(1, 4)])
+        event.listen(session.sync_session, 'after_commit', lambda _: notifications.append(('commit', None)))
+
+        assert await schedules.send_challenge_notifications() == 3
+
+        assert notifications == [('commit', None), ('enqueue', 1), ('enqueue', 2), ('commit', None), ('enqueue', 3)]
+
+    run(test)
+
+
+def test_mailings_are_enqueued_outside_the_chunk_transaction(run, notifications, monkeypatch):
+    async def test(session, client):
+        await add_users(session, client, [(user_id, 'c1', None, []) for user_id in range(1, 4)])
+        session.add(Mailing(message_text='Mailing', button_text='Open', button_url='https://example.com', challenge_id='c1'))
+        await session.commit()
+        in_transaction = []
+
+        async def enqueue_user_message(user_id, text, *attachments):
+            in_transaction.append(session.in_transaction())
+
+        monkeypatch.setattr(sender, 'enqueue_user_message', enqueue_user_message)
+
+        assert await schedules.send_user_mailings() is None
+        assert in_transaction == [False, False, False]
+
+    run(test)
@@ -0,0 +1,96 @@
+import math
+import random
+
+import pytest
+
+from src.models import ChallengeElement, PlacedElementRequest
+from src.scoring import CompiledChallenge, ScoringConfig
+
+ELEMENTS = [
+    ChallengeElement(id='bench', challenge_id='park', name='Bench', width=50, target_x=100, target_y=200),
+    ChallengeElement(id='ramp', challenge_id='park', name='Ramp', width=80, target_x=400, target_y=50),
+    ChallengeElement(id='sign', challenge_id='park', name='Sign', width=20, target_x=700, target_y=600),
+]
+
+
+def reference_score(placed_elements, max_error: float = 2000) -> float:
+    placed = {element.id: element for element in placed_elements}
+    total_error = sum(
+        abs(placed[element.id].x - element.target_x) + abs(placed[element.id].y - element.target_y)
+        for element in ELEMENTS
+        if element.id in placed
+    )
+
+    return round(max(0.0, 1 - min(total_error / max_error, 1.0)) * 100, 1)
+
+
+@pytest.mark.parametrize(
+    'placed_elements',
+    [
+        [],
+        [PlacedElementRequest(id='bench', x=100, y=200)],
+        [PlacedElementRequest(id='bench', x=130, y=170), PlacedElementRequest(id='ramp', x=410, y=90)],
+        [
+            PlacedElementRequest(id='bench', x=0, y=0),
+            PlacedElementRequest(id='ramp', x=800, y=600),
+            PlacedElementRequest(id='sign', x=0, y=0),
+        ],
+        [PlacedElementRequest(id='unknown', x=5, y=5), PlacedElementRequest(id='sign', x=690.5, y=612.25)],
+    ]
+)
+def test_score_matches_reference(placed_elements):
+    scorer = CompiledChallenge(ELEMENTS, 800, 600, ScoringConfig())
+    assert scorer.score(placed_elements) == reference_score(placed_elements)
+
+
+def test_score_many():
+    scorer = CompiledChallenge(ELEMENTS, 800, 600, ScoringConfig())
+    submissions = [
+        [PlacedElementRequest(id='bench', x=100, y=200)],
+        [PlacedElementRequest(id='bench', x=600, y=200)],
+        [PlacedElementRequest(id='ramp', x=400, y=2050)],
+    ]
+
+    assert scorer.score_many(submissions) == [100.0, 75.0, 0.0]
+    assert scorer.score_many([]) == []
+
+
+def test_score_l2_metric():
+    scorer = CompiledChallenge(ELEMENTS, 800, 600, ScoringConfig(metric='l2', max_error=100))
+    assert scorer.score([PlacedElementRequest(id='bench', x=130, y=240)]) == 50.0
+
+
+def test_score_weights_and_tolerance():
+    scoring_config = ScoringConfig(max_error=100, tolerance=10, weights={'ramp': 2})
+    scorer = CompiledChallenge(ELEMENTS, 800, 600, scoring_config)
+
+    assert scorer.score([PlacedElementRequest(id='bench', x=105, y=205)]) == 100.0
+    assert scorer.score([PlacedElementRequest(id='ramp', x=420, y=50)]) == 80.0
+
+
+def test_score_normalized():
+    scorer = CompiledChallenge(ELEMENTS, 800, 600, ScoringConfig(normalize=True, max_error=1))
+    score = scorer.score([PlacedElementRequest(id='bench', x=180, y=260)])
+
+    assert math.isclose(score, 80.0)
+
+
+@pytest.mark.parametrize('scoring_config', [
+    ScoringConfig(),
+    ScoringConfig(metric='l2', max_error=300),
+    ScoringConfig(max_error=100, tolerance=10, weights={'ramp': 2}, normalize=True),
+])
+def test_score_matches_score_many(scoring_config):
+    scorer = CompiledChallenge(ELEMENTS, 800, 600, scoring_config)
+    rng = random.Random(1)
+    submissions = [
+        [
+            PlacedElementRequest(id=element.id, x=rng.uniform(0, 800), y=rng.uniform(0, 600))
+            for element in ELEMENTS
+            if rng.random() < 0.8
+        ]
+        for _ in range(200)
+    ]
+    submissions.append([PlacedElementRequest(id='bench', x=math.nan, y=0), PlacedElementRequest(id='ramp', x=400, y=60)])
+
+    assert [scorer.score(placed_elements) for placed_elements in submissions] == scorer.score_many(submissions)
@@ -0,0 +1,53 @@
+import asyncio
+
+from src import sender as sender_module
+from src.sender import Sender
+
+
+def test_join_drains_queued_jobs(run):
+    async def test(session, client):
+        sender = Sender(workers=2, rate=1000, burst=10, queue_size=10)
+        done = []
+
+        async def job():
+            await asyncio.sleep(0.01)
+            done.append(True)
+
+        for _ in range(5):
+            await sender.enqueue(job)
+
+        workers = asyncio.create_task(sender.run())
+        await sender.join(timeout=1)
+        workers.cancel()
+
+        assert len(done) == 5
+
+    run(test)
+
+
+def test_join_gives_up_after_timeout(run):
+    async def test(session, client):
+        sender = Sender(workers=1, rate=1000, burst=10, queue_size=10)
+        await sender.enqueue(asyncio.Event().wait)
+
+        await sender.join(timeout=0.01)
+
+        assert sender.queue.qsize() == 1
+
+    run(test)
+
+
+def test_deletions_are_delivered_when_due(run, monkeypatch):
+    async def test(session, client):
+        sender = Sender(workers=1, rate=1000, burst=10, queue_size=10)
+        monkeypatch.setattr(sender_module, 'get_sender', lambda: sender)
+
+        await sender_module.delete_user_message_later('m1', 0)
+        await sender_module.delete_user_message_later('m2', 60)
+
+        assert await sender_module.deliver_due_deletions() == 1
+        assert await sender_module.deliver_due_deletions() == 0
+        assert sender.queue.get_nowait().args == ('m1',)
+        assert await client.zrange('deletions:due', 0, -1) == ['m2']
+
+    run(test)
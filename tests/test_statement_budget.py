@@ -0,0 +1,90 @@
+import pytest
+from sqlmodel import select
+
+from src.main_flow import get_user_names
+from src.metrics import assert_max_statements, count_statements
+from src.models import User, Challenge, ChallengeElement, Mailing, LeaderboardEntry
+from src.routes import fill_missing_names
+
+USERS_COUNT = 10
+
+
+@pytest.fixture
+def challenge(session):
+    session.add(Challenge(id='c1', name='Challenge', description='', scene_width=100, scene_height=100, ordinal=1))
+    session.add(ChallengeElement(id='e1', challenge_id='c1', name='Ramp', width=10, target_x=1, target_y=2))
+    session.add(ChallengeElement(id='e2', challenge_id='c1', name='Lift', width=20, target_x=3, target_y=4))
+    for index in range(3):
+        session.add(Mailing(message_text=f'Mailing {index}', button_text='Open', button_url='https://example.com', challenge_id='c1'))
+    for user_id in range(1, USERS_COUNT + 1):
+        session.add(User(id=user_id, name=f'User {user_id}', username=None, avatar_url=None, current_challenge_id='c1'))
+
+    session.commit()
+    session.expunge_all()
+
+
+def add_users(session, count: int):
+    for user_id in range(1, count + 1):
+        session.add(User(id=user_id, name=f'User {user_id}', username=None, avatar_url=None))
+
+
+def test_count_statements(session, challenge):
+    with count_statements() as outer:
+        session.exec(select(User.id)).all()
+        with count_statements() as inner:
+            session.exec(select(User.name)).all()
+
+    assert inner.count == 1
+    assert outer.count == 2
+
+
+def test_assert_max_statements_catches_n_plus_one(session, challenge):
+    with pytest.raises(AssertionError, match=f'got {USERS_COUNT}'):
+        with assert_max_statements(1):
+            for user_id in range(1, USERS_COUNT + 1):
+                session.exec(select(User.name).where(User.id == user_id)).one()
+
+
+def test_relationships_load_in_constant_statements(session, challenge):
+    with assert_max_statements(2):
+        mailings = session.exec(Mailing.select()).all()
+        assert {mailing.challenge.id for mailing in mailings} == {'c1'}
+        assert len(mailings[0].challenge.elements) == 2
+
+
+@pytest.mark.parametrize('users_count', [1, 50])
+def test_get_user_names_budget(run, users_count):
+    async def test(session, redis):
+        add_users(session, users_count)
+        await session.commit()
+        await redis.hset('user:names', '1', 'Cached')
+
+        with assert_max_statements(1):
+            user_names = await get_user_names(list(range(1, users_count + 1)))
+
+        assert user_names[1] == 'Cached'
+        assert user_names[users_count] == ('Cached' if users_count == 1 else f'User {users_count}')
+
+        with assert_max_statements(0):
+            await get_user_names(list(range(1, users_count + 1)))
+
+    run(test)
+
+
+@pytest.mark.parametrize('users_count', [1, 50])
+def test_fill_missing_names_budget(run, users_count):
+    async def test(session, redis):
+        add_users(session, users_count)
+        await session.commit()
+
+        entries = [
+            LeaderboardEntry(place=user_id, user_id=user_id, name=None, score=50)
+            for user_id in range(1, users_count + 1)
+        ]
+        with assert_max_statements(1):
+            await fill_missing_names(entries + entries[:1])
+
+        assert [entry.name for entry in entries] == [f'User {user_id}' for user_id in range(1, users_count + 1)]
+        assert await redis.hget('user:names', str(users_count)) == f'User {users_count}'
+
+    run(test)
@@ -0,0 +1,38 @@
+from src import redis
+
+
+def test_submit_score_seeds_legacy_scores(run):
+    async def test(session, client):
+        await client.hset('user:1:ratings', mapping={'c1': '60', 'c2': '80'})
+
+        assert await redis.submit_user_challenge_score(1, 'c3', 100, 'Alice') == (None, 80.0, 0)
+        assert await client.hgetall('user:1:ratings:stats') == {'sum': '240', 'count': '3'}
+        assert await client.zscore('user:ratings', '1') == 80.0
+        assert await client.hget('user:names', '1') == 'Alice'
+
+    run(test)
+
+
+def test_submit_score_resubmission(run):
+    async def test(session, client):
+        await redis.submit_user_challenge_score(1, 'c1', 60)
+        await redis.submit_user_challenge_score(1, 'c2', 80)
+
+        assert await redis.submit_user_challenge_score(1, 'c2', 50) == (80.0, 70.0, 0)
+        assert await redis.submit_user_challenge_score(1, 'c1', 90) == (60.0, 85.0, 0)
+        assert await client.hgetall('user:1:ratings') == {'c1': '90', 'c2': '80'}
+
+    run(test)
+
+
+def test_submit_score_average_and_place(run):
+    async def test(session, client):
+        await redis.submit_user_challenge_score(1, 'c1', 33.33)
+        await redis.submit_user_challenge_score(1, 'c2', 66.67)
+        await redis.submit_user_challenge_score(1, 'c3', 50.04)
+
+        assert await redis.submit_user_challenge_score(2, 'c1', 90) == (None, 90.0, 0)
+        assert await client.zscore('user:ratings', '1') == 50.0
+        assert await redis.get_user_place(1) == 1
+
+    run(test)
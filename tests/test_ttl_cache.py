@@ -0,0 +1,44 @@
+import time
+
+from src.cache import TTLCache
+
+
+def test_ttl_cache_get_set():
+    cache = TTLCache[str, int](max_size=10)
+    cache.set('a', 1, expires_at=time.time() + 60)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+
+
+def test_ttl_cache_expired():
+    cache = TTLCache[str, int](max_size=10)
+    cache.set('a', 1, expires_at=time.time() - 1)
+    cache.entries['b'] = (2, time.time() - 1)
+
+    assert cache.get('a') is None
+    assert cache.get('b') is None
+    assert not cache.entries
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache[str, int](max_size=2)
+    expires_at = time.time() + 60
+
+    cache.set('a', 1, expires_at)
+    cache.set('b', 2, expires_at)
+    cache.get('a')
+    cache.set('c', 3, expires_at)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+
+def test_ttl_cache_invalidate():
+    cache = TTLCache[str, int](max_size=10)
+    cache.set('a', 1, expires_at=time.time() + 60)
+    cache.invalidate('a')
+    cache.invalidate('b')
+
+    assert cache.get('a') is None
@@ -0,0 +1,142 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import ClientError
+from maxapi.types import OtherAttachmentPayload
+from pydantic import ValidationError
+
+from src import uploads
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: dict):
+        self.status = status
+        self.ok = status < 400
+        self.body = body
+
+    async def json(self, content_type=None):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession:
+    def __init__(self, *responses: FakeResponse):
+        self.responses = list(responses)
+
+    def post(self, url, data):
+        return self.responses.pop(0)
+
+
+def create_uploader(session=None, attempts: int = 3) -> uploads.Uploader:
+    return uploads.Uploader(session, concurrency=2, attempts=attempts, backoff=0, token_cache_size=10)
+
+
+def payload(token: str) -> OtherAttachmentPayload:
+    return OtherAttachmentPayload(token=token, url='https://upload')
+
+
+def test_attempts_must_be_positive():
+    with pytest.raises(ValidationError):
+        uploads.Config.model_validate({'attempts': 0})
+
+
+def test_upload_retries_transient_errors(run, monkeypatch):
+    async def test(session, client):
+        uploader = create_uploader()
+        errors = [ClientError('reset'), uploads.TransientUploadError('503')]
+        calls = []
+
+        async def try_upload_image(image, filename):
+            calls.append(filename)
+            if errors:
+                raise errors.pop(0)
+            return payload('token')
+
+        monkeypatch.setattr(uploader, 'try_upload_image', try_upload_image)
+
+        assert (await uploader.upload_image(b'image', 'a.png')).token == 'token'
+        assert len(calls) == 3
+
+    run(test)
+
+
+def test_upload_gives_up_after_attempts(run, monkeypatch):
+    async def test(session, client):
+        uploader = create_uploader(attempts=2)
+        calls = []
+
+        async def try_upload_image(image, filename):
+            calls.append(filename)
+            raise uploads.TransientUploadError('503')
+
+        monkeypatch.setattr(uploader, 'try_upload_image', try_upload_image)
+
+        with pytest.raises(uploads.TransientUploadError):
+            await uploader.upload_image(b'image', 'a.png')
+        assert len(calls) == 2
+
+        calls.clear()
+        monkeypatch.setattr(uploader, 'attempts', 3)
+
+        async def reject(image, filename):
+            calls.append(filename)
+            raise ValueError('rejected')
+
+        monkeypatch.setattr(uploader, 'try_upload_image', reject)
+
+        with pytest.raises(ValueError):
+            await uploader.upload_image(b'image', 'a.png')
+        assert len(calls) == 1
+
+    run(test)
+
+
+def test_identical_images_share_one_upload(run, monkeypatch):
+    async def test(session, client):
+        uploader = create_uploader()
+        calls = []
+
+        async def try_upload_image(image, filename):
+            calls.append(image)
+            await asyncio.sleep(0.01)
+            return payload(image.decode())
+
+        monkeypatch.setattr(uploader, 'try_upload_image', try_upload_image)
+
+        results = await asyncio.gather(
+            uploader.upload_image(b'a', 'a.png'),
+            uploader.upload_image(b'a', 'a.png'),
+            uploader.upload_image(b'b', 'b.png')
+        )
+        assert [result.token for result in results] == ['a', 'a', 'b']
+        assert sorted(calls) == [b'a', b'b']
+        assert not uploader.pending
+
+        assert (await uploader.upload_image(b'a', 'a.png')).token == 'a'
+        assert len(calls) == 2
+
+    run(test)
+
+
+def test_upload_without_photos_fails(run, monkeypatch):
+    async def test(session, client):
+        async def get_upload_url(upload_type):
+            return SimpleNamespace(url='https://upload')
+
+        monkeypatch.setattr(uploads.bot, 'get_bot', lambda: SimpleNamespace(get_upload_url=get_upload_url))
+        uploader = create_uploader(FakeSession(
+            FakeResponse(200, {'photos': {'p1': {'token': 'token'}}}),
+            FakeResponse(200, {'photos': {}})
+        ))
+
+        assert (await uploader.try_upload_image(b'image', 'a.png')).token == 'token'
+        with pytest.raises(ValueError, match='no photos'):
+            await uploader.try_upload_image(b'image', 'a.png')
+
+    run(test)
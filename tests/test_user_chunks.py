@@ -0,0 +1,56 @@
+import pytest
+
+from src.models import User
+
+USERS_COUNT = 7
+
+
+async def add_users(session):
+    for user_id in range(1, USERS_COUNT + 1):
+        session.add(User(id=user_id, name=f'User {user_id}', username=None, avatar_url=None))
+    await session.commit()
+
+
+async def collect_chunks(**kwargs) -> list:
+    return [[user.id for user in users] async for users in User.iter_chunks(**kwargs)]
+
+
+@pytest.mark.parametrize('chunk_size, sizes', [
+    (1, [1] * USERS_COUNT),
+    (3, [3, 3, 1]),
+    (USERS_COUNT, [USERS_COUNT]),
+    (USERS_COUNT + 1, [USERS_COUNT])
+])
+def test_iter_chunks_pages_without_gaps(run, chunk_size, sizes):
+    async def test(session, client):
+        await add_users(session)
+
+        chunks = await collect_chunks(chunk_size=chunk_size)
+
+        assert [len(chunk) for chunk in chunks] == sizes
+        assert sum(chunks, []) == list(range(1, USERS_COUNT + 1))
+
+    run(test)
+
+
+def test_iter_chunks_shards_are_disjoint(run):
+    async def test(session, client):
+        await add_users(session)
+
+        shards = [sum(await collect_chunks(chunk_size=2, shard=shard, shards=3), []) for shard in range(3)]
+
+        assert shards == [[3, 6], [1, 4, 7], [2, 5]]
+        assert sorted(sum(shards, [])) == list(range(1, USERS_COUNT + 1))
+
+    run(test)
+
+
+def test_iter_chunks_filters_rows(run):
+    async def test(session, client):
+        await add_users(session)
+
+        chunks = await collect_chunks(chunk_size=2, where=User.id % 2 == 0)
+
+        assert chunks == [[2, 4], [6]]
+
+    run(test)
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from src import user_versions
+from src.cache import user_cache
+from src.metrics import assert_max_statements
+from src.models import User
+
+
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    user_cache.entries.clear()
+    yield
+    user_cache.entries.clear()
+
+
+async def add_user(session) -> User:
+    session.add(User(id=1, name='User 1', username=None, avatar_url=None))
+    await session.commit()
+    return await user_versions.get_cached_user(1)
+
+
+def test_cached_user_is_served_while_version_is_unchanged(run):
+    async def test(session, redis):
+        user = await add_user(session)
+
+        with assert_max_statements(0):
+            assert await user_versions.get_cached_user(1) is user
+
+        assert await user_versions.get_cached_user(2) is None
+
+    run(test)
+
+
+def test_commit_publishes_changed_users(run):
+    async def test(session, redis):
+        await add_user(session)
+
+        await User.update_many([1], name='Renamed')
+        await session.commit()
+        await asyncio.gather(*user_versions.pending_tasks)
+
+        assert await redis.get('user:1:version') == '1'
+        assert await redis.get('user:1:written') is not None
+        assert user_cache.get(1) is None
+        assert (await user_versions.get_cached_user(1)).name == 'Renamed'
+
+    run(test)
+
+
+def test_write_on_another_replica_invalidates_cache(run, monkeypatch):
+    async def test(session, redis):
+        user = await add_user(session)
+        reads = []
+
+        async def get_primary_user(user_id):
+            reads.append('primary')
+            return user
+
+        async def get_replica_user(user_id):
+            reads.append('replica')
+            return user
+
+        monkeypatch.setattr(user_versions, 'get_primary_user', get_primary_user)
+        monkeypatch.setattr(user_versions, 'get_replica_user', get_replica_user)
+
+        await redis.incr('user:1:version')
+        await user_versions.get_cached_user(1)
+        await user_versions.get_cached_user(1)
+
+        await redis.set('user:1:written', 1)
+        await redis.incr('user:1:version')
+        await user_versions.get_cached_user(1)
+
+        assert reads == ['replica', 'primary']
+        assert user_cache.get(1)[1] == 2
+
+    run(test)
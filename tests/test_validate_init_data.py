@@ -75,3 +75,13 @@ def test_validate_init_data_fail():
 
     with pytest.raises(ValueError):
         validate_init_data(init_data, bot_token)
+
+
+def test_validate_init_data_rotated_token():
+    bot_token = 'TEST_BOT_TOKEN'
+    init_data = generate_valid_init_data(bot_token)
+
+    validate_init_data(init_data, ['NEW_BOT_TOKEN', bot_token])
+
+    with pytest.raises(ValueError):
+        validate_init_data(init_data, ['NEW_BOT_TOKEN'])
@@ -0,0 +1,113 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from maxapi import Dispatcher, Router
+
+from src import bot, webhook
+
+SECRET = 'webhook-secret'
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    update_processor = webhook.UpdateProcessor(concurrency=1, max_pending=1)
+    monkeypatch.setattr(bot.Config, 'webhook_secret', SECRET)
+    monkeypatch.setattr(webhook, 'get_update_processor', lambda: update_processor)
+    return update_processor
+
+
+async def post_update(headers: dict, update: dict) -> int:
+    app = FastAPI()
+    app.include_router(webhook.router)
+
+    body = json.dumps(update).encode()
+    scope = {
+        'type': 'http',
+        'method': 'POST',
+        'path': webhook.WEBHOOK_PATH,
+        'query_string': b'',
+        'headers': [(key.lower().encode(), value.encode()) for key, value in headers.items()],
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    statuses = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await app(scope, receive, send)
+    return statuses[0]
+
+
+@pytest.mark.parametrize('headers', [{}, {'X-Max-Bot-Api-Secret': 'wrong'}])
+def test_webhook_rejects_invalid_secret(run, processor, headers):
+    async def test(session, client):
+        assert await post_update(headers, {'update_type': 'bot_started'}) == 401
+        assert not processor.tasks
+
+    run(test)
+
+
+def test_webhook_rejects_everything_without_secret(run, processor, monkeypatch):
+    monkeypatch.setattr(bot.Config, 'webhook_secret', None)
+
+    async def test(session, client):
+        assert await post_update({'X-Max-Bot-Api-Secret': ''}, {'update_type': 'bot_started'}) == 401
+
+    run(test)
+
+
+def test_webhook_returns_503_when_pending_limit_is_full(run, processor):
+    async def test(session, client):
+        headers = {'X-Max-Bot-Api-Secret': SECRET}
+        # The processor is not started, so the first update stays pending.
+        assert await post_update(headers, {'update_type': 'bot_started'}) == 200
+        assert await post_update(headers, {'update_type': 'bot_started'}) == 503
+        assert len(processor.tasks) == 1
+
+        for task in processor.tasks:
+            task.cancel()
+
+    run(test)
+
+
+def test_processor_prepares_dispatcher_and_handles_updates(run, processor, monkeypatch):
+    async def test(session, client):
+        handled = []
+
+        async def get_me():
+            return SimpleNamespace(username='bot', first_name='Bot', user_id=1)
+
+        async def process_update_webhook(event_json, bot_instance):
+            return event_json
+
+        async def handle(event):
+            handled.append(event)
+
+        bot_instance = SimpleNamespace(get_me=get_me, auto_check_subscriptions=False, commands=[])
+        dispatcher = Dispatcher()
+        router = Router()
+        dispatcher.include_routers(router)
+        monkeypatch.setattr(webhook, 'process_update_webhook', process_update_webhook)
+        monkeypatch.setattr(dispatcher, 'handle', handle)
+
+        assert processor.submit({'update_type': 'bot_started'})
+        await asyncio.sleep(0)
+        assert not handled
+
+        # This relies on a private maxapi method, see the pin in requirements.txt.
+        await processor.start(bot_instance, dispatcher)
+        await asyncio.gather(*processor.tasks)
+
+        assert handled == [{'update_type': 'bot_started'}]
+        assert dispatcher.bot is bot_instance
+        assert router.bot is bot_instance
+        assert dispatcher in dispatcher.routers
+
+    run(test)